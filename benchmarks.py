@@ -0,0 +1,374 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import types
+
+import pandas as pd
+
+import parse_addenda
+import parse_amm_bdpm
+from canonisation import compile_index
+from extraction_arp import ExtracteurTableAMM
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+FICHIER_REFERENCE = "benchmarks_reference.json"
+SEUIL_REGRESSION = 0.25  # +25 % par rapport à la référence => échec
+ECHELLES = (1, 10)       # 100 possible via --echelles 1,10,100
+REPETITIONS = 3          # on garde le meilleur temps
+
+# Tailles à l'échelle 1
+TAILLE = {
+    "order": 5000,        # lignes icd10pcs_order_YYYY.txt
+    "addenda": 500,       # lignes index_addenda_YYYY.txt
+    "compo": 3000,        # lignes CIS_COMPO_bdpm.txt
+    "normalise": 5000,    # chaînes à normaliser
+    "match": 200,         # substances à rapprocher (dictionnaire fixe)
+    "arp": 500,           # lignes du tableau HTML ARP
+    "icdo3": 200,         # lignes du classeur ICD-O-3
+    "ocr": 5,             # pages PDF
+}
+TAILLE_DICT_MATCH = 2000
+
+MOTS = [
+    "Bypass", "Cerebral", "Ventricle", "Nasopharynx", "Autologous", "Tissue",
+    "Substitute", "Open", "Approach", "Percutaneous", "Endoscopic", "Drainage",
+    "Device", "Upper", "Lower", "Artery", "Vein", "Left", "Right", "Excision",
+]
+SUBSTANCES = [
+    "AMOXICILLINE", "PARACÉTAMOL", "CHLORHYDRATE DE PYRIDOXINE", "ACIDE FOLIQUE",
+    "CYANOCOBALAMINE", "MÉTRONIDAZOLE", "IBUPROFÈNE", "CEFTRIAXONE SODIQUE",
+    "ARTÉMÉTHER", "LUMÉFANTRINE", "OMÉPRAZOLE", "SULFATE FERREUX",
+]
+
+
+# =========================
+# GÉNÉRATEURS DE DONNÉES
+# =========================
+
+def _code(rng) -> str:
+    return "".join(rng.choices(string.digits + "ABCDEFGHJKLMNPQRSTUVWXYZ", k=7))
+
+
+def _libelle(rng, n=6) -> str:
+    return " ".join(rng.choices(MOTS, k=n))
+
+
+def _substance(rng) -> str:
+    base = rng.choice(SUBSTANCES)
+    return f"{base} {''.join(rng.choices(string.ascii_uppercase, k=5))}"
+
+
+def genere_order(chemin, n, rng):
+    with open(chemin, "w", encoding="utf-8") as f:
+        for i in range(1, n + 1):
+            court = _libelle(rng, 4)[:60]
+            f.write(f"{i:05d} {_code(rng)} {rng.randint(0, 1)} {court:<60} {_libelle(rng, 8)}\n")
+
+
+def genere_addenda(chemin, n, rng):
+    with open(chemin, "w", encoding="utf-8") as f:
+        for i in range(n):
+            tirage = rng.random()
+            if tirage < 0.3:
+                f.write(f"     Delete        {_libelle(rng, 3)} {_code(rng)}\n")
+            elif tirage < 0.6:
+                f.write(f"Main Add         {_libelle(rng, 4)} use {_libelle(rng, 2)}\n")
+            elif tirage < 0.9:
+                f.write(f"     Revise to   {_libelle(rng, 5)} {_code(rng)}\n")
+            else:
+                f.write(f"\nLttr             {rng.choice(string.ascii_uppercase)}\n")
+
+
+def genere_compo(chemin, n, rng):
+    with open(chemin, "w", encoding="latin-1") as f:
+        for i in range(n):
+            sub = _substance(rng)
+            f.write(
+                f"{60000000 + i}\tcomprimé\t{rng.randint(1, 99999):05d}\t{sub}\t"
+                f"{rng.randint(1, 1000)},00 mg\tun comprimé\tSA\t{i % 9 + 1}\r\n"
+            )
+
+
+def genere_html_arp(chemin, n, rng):
+    entetes = ["Nom du Medicament", "Numero AMM", "DCI", "dosage", "Conditionnement", "RCP"]
+    with open(chemin, "w", encoding="utf-8") as f:
+        f.write("<html><body><table><tr><th>Menu</th></tr><tr><td>x</td></tr></table>")
+        f.write("<table><thead><tr>" + "".join(f"<th>{e}</th>" for e in entetes) + "</tr></thead><tbody>")
+        for i in range(n):
+            dci = " / ".join(_substance(rng) for _ in range(rng.randint(1, 3)))
+            f.write(
+                f"<tr><td>{_libelle(rng, 2).upper()} {i}</td><td>{i}</td><td>{dci}</td>"
+                f"<td>{rng.randint(1, 1000)} mg</td><td>BOITE / {rng.randint(1, 30)}</td>"
+                "<td><a href='#'>RCP</a></td></tr>"
+            )
+        f.write("</tbody></table></body></html>")
+
+
+def genere_icdo3(chemin, n, rng):
+    lignes = [
+        {
+            "Site recode": f"C{rng.randint(0, 80):02d}.{rng.randint(0, 9)}",
+            "Site Description": f"{rng.choice(['Upper lobe', 'Lower lobe', 'Main bronchus'])}, lung",
+            "Histology": f"{rng.randint(8000, 9999)}/3",
+            "Histology Description": rng.choice(
+                ["Malignant neoplasm, NOS", "Carcinoma, NOS", "Adenocarcinoma, NOS"]
+            ),
+        }
+        for _ in range(n)
+    ]
+    pd.DataFrame(lignes).to_excel(chemin, index=False)
+
+
+# =========================
+# BACKENDS FACTICES
+# =========================
+
+def _charge_module(nom, chemin, faux_modules):
+    """Charge un script avec des modules tiers remplacés par des faux."""
+    anciens = {k: sys.modules.get(k) for k in faux_modules}
+    sys.modules.update(faux_modules)
+    try:
+        spec = importlib.util.spec_from_file_location(nom, chemin)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for k, v in anciens.items():
+            if v is None:
+                sys.modules.pop(k, None)
+            else:
+                sys.modules[k] = v
+    return module
+
+
+def charge_traduction_factice():
+    langdetect = types.ModuleType("langdetect")
+    langdetect.detect_langs = lambda txt: [types.SimpleNamespace(lang="en", prob=0.99)]
+
+    class FauxTraducteur:
+        def __init__(self, source="auto", target="fr"):
+            self.target = target
+
+        def translate(self, txt):
+            return f"[{self.target}] {txt}"
+
+    deep_translator = types.ModuleType("deep_translator")
+    deep_translator.GoogleTranslator = FauxTraducteur
+
+    module = _charge_module(
+        "translate_icd_o3",
+        "translate_icd-o3.py",
+        {"langdetect": langdetect, "deep_translator": deep_translator},
+    )
+    module.time = types.SimpleNamespace(sleep=lambda s: None, perf_counter=time.perf_counter)  # pas de pause API
+    return module
+
+
+def charge_ocr_factice():
+    class FauxDoc:
+        def __init__(self, nb_pages):
+            self.page_count = nb_pages
+
+        def load_page(self, i):
+            pixmap = types.SimpleNamespace(tobytes=lambda fmt: b"\x89PNG")
+            return types.SimpleNamespace(get_pixmap=lambda matrix, alpha: pixmap)
+
+        def close(self):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.close()
+
+    fitz = types.ModuleType("fitz")
+    fitz.Matrix = lambda x, y: (x, y)
+    fitz.open = lambda chemin: FauxDoc(int(open(chemin).read()))
+
+    texte = "Compte rendu opératoire <patient> & suivi\n" * 40
+    pytesseract = types.ModuleType("pytesseract")
+    pytesseract.image_to_string = lambda image, lang=None: texte
+
+    pil = types.ModuleType("PIL")
+    pil.Image = types.SimpleNamespace(open=lambda flux: flux)
+
+    return _charge_module(
+        "nelly_ocr",
+        "nelly_ocr.py",
+        {"fitz": fitz, "pytesseract": pytesseract, "PIL": pil, "PIL.Image": pil.Image},
+    )
+
+
+# =========================
+# CAS DE BENCHMARK
+# =========================
+
+def cas_benchmarks(dossier, echelle, rng):
+    """Retourne {nom: fonction sans argument} ; la préparation n'est pas chronométrée."""
+    cas = {}
+
+    chemin_order = os.path.join(dossier, "icd10pcs_order_2025.txt")
+    genere_order(chemin_order, TAILLE["order"] * echelle, rng)
+    cas["parse_order_file"] = lambda: parse_addenda.parse_order_file(chemin_order, 2025)
+
+    chemin_addenda = os.path.join(dossier, "index_addenda_2025.txt")
+    genere_addenda(chemin_addenda, TAILLE["addenda"] * echelle, rng)
+    cas["parse_addenda_file"] = lambda: parse_addenda.parse_addenda_file(chemin_addenda, 2025)
+
+    chaines = [_substance(rng).lower() for _ in range(TAILLE["normalise"] * echelle)]
+    cas["normalise_chaine"] = lambda: [parse_amm_bdpm.normalise_chaine(s) for s in chaines]
+
+    chemin_compo = os.path.join(dossier, "CIS_COMPO_bdpm.txt")
+    genere_compo(chemin_compo, TAILLE["compo"] * echelle, rng)
+    cas["construit_dict_substances"] = lambda: parse_amm_bdpm.construit_dict_substances(
+        parse_amm_bdpm.lit_compo(chemin_compo)
+    )
+
+    noms = [parse_amm_bdpm.normalise_chaine(_substance(rng)) for _ in range(TAILLE_DICT_MATCH)]
+    dict_exact = {n: (i, n) for i, n in enumerate(noms)}
+    requetes = []
+    for _ in range(TAILLE["match"] * echelle):
+        nom = rng.choice(noms)
+        if rng.random() < 0.25:  # faute de frappe -> chemin flou
+            i = rng.randrange(len(nom))
+            nom = nom[:i] + nom[i + 1:]
+        requetes.append(nom)
+    cas["match_substance"] = lambda: [
+        parse_amm_bdpm.match_substance(q, dict_exact, noms) for q in requetes
+    ]
+    index_canonique = compile_index(dict_exact)
+    cas["match_substance_canonique"] = lambda: [
+        parse_amm_bdpm.match_substance(q, dict_exact, noms, index_canonique=index_canonique)
+        for q in requetes
+    ]
+
+    chemin_html = os.path.join(dossier, "arp.html")
+    genere_html_arp(chemin_html, TAILLE["arp"] * echelle, rng)
+
+    def extraction_arp():
+        with open(chemin_html, "rb") as f:
+            return list(ExtracteurTableAMM(f).lignes())
+
+    cas["extraction_arp"] = extraction_arp
+
+    chemin_xlsx = os.path.join(dossier, "sitetype.xlsx")
+    genere_icdo3(chemin_xlsx, TAILLE["icdo3"] * echelle, rng)
+    traduction = charge_traduction_factice()
+    cas["traduction_icdo3"] = lambda: traduction.translate_excel_to_french(
+        chemin_xlsx, os.path.join(dossier, "sitetype.fr.xlsx")
+    )
+
+    chemin_pdf = os.path.join(dossier, "scan.pdf")
+    with open(chemin_pdf, "w") as f:
+        f.write(str(TAILLE["ocr"] * echelle))  # le faux fitz y lit le nb de pages
+    ocr = charge_ocr_factice()
+    cas["ocr_html"] = lambda: ocr.pdf_to_html_ocr(chemin_pdf, os.path.join(dossier, "scan.html"))
+
+    return cas
+
+
+def chronometre(fonction, repetitions=REPETITIONS) -> float:
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def lance_benchmarks(echelles=ECHELLES, filtre=None, repetitions=REPETITIONS, graine=0):
+    resultats = {}
+    for echelle in echelles:
+        rng = random.Random(graine)
+        with tempfile.TemporaryDirectory() as dossier:
+            cas = cas_benchmarks(dossier, echelle, rng)
+            for nom, fonction in cas.items():
+                if filtre and filtre not in nom:
+                    continue
+                cle = f"{nom}@{echelle}x"
+                resultats[cle] = chronometre(fonction, repetitions)
+                print(f"  {cle:<32} {resultats[cle] * 1000:10.2f} ms")
+    return resultats
+
+
+def compare(resultats, reference, seuil=SEUIL_REGRESSION):
+    """
+    (régressions, cas absents de la référence). Une régression est un
+    (cas, temps, référence) dépassant la référence de plus de `seuil`.
+    """
+    regressions, manquants = [], []
+    for cle, duree in resultats.items():
+        ref = reference.get(cle)
+        if ref is None:
+            print(f"  {cle:<32} {'-':>6}   ABSENT DE LA RÉFÉRENCE")
+            manquants.append(cle)
+            continue
+        ratio = duree / ref if ref else float("inf")
+        marque = "REGRESSION" if ratio > 1 + seuil else ""
+        print(f"  {cle:<32} {ratio:6.2f}x  {marque}")
+        if marque:
+            regressions.append((cle, duree, ref))
+    return regressions, manquants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des parseurs et du rapprochement")
+    parser.add_argument("--echelles", default=",".join(map(str, ECHELLES)))
+    parser.add_argument("--filtre", default=None, help="ne lance que les cas contenant ce texte")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS)
+    parser.add_argument("--seuil", type=float, default=SEUIL_REGRESSION)
+    parser.add_argument("--reference", default=FICHIER_REFERENCE)
+    parser.add_argument(
+        "--enregistre", action="store_true", help="enregistre les temps comme nouvelle référence"
+    )
+    args = parser.parse_args()
+
+    # Les scripts lus (translate_icd-o3.py, nelly_ocr.py) sont relatifs au dépôt
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    echelles = [int(e) for e in args.echelles.split(",") if e]
+    print("Benchmarks (meilleur temps) :")
+    resultats = lance_benchmarks(echelles, args.filtre, args.repetitions)
+
+    if args.enregistre:
+        reference = {}
+        if os.path.exists(args.reference):
+            with open(args.reference, encoding="utf-8") as f:
+                reference = json.load(f)
+        reference.update(resultats)
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(reference, f, indent=2, sort_keys=True)
+        print(f"✅ Référence enregistrée : {args.reference}")
+        return
+
+    if not os.path.exists(args.reference):
+        print(f"❌ Pas de référence ({args.reference}) : lancer avec --enregistre")
+        sys.exit(1)
+
+    with open(args.reference, encoding="utf-8") as f:
+        reference = json.load(f)
+    print(f"\nComparaison avec {args.reference} (seuil +{args.seuil:.0%}) :")
+    regressions, manquants = compare(resultats, reference, args.seuil)
+    if manquants:
+        print(f"❌ {len(manquants)} cas absent(s) de la référence : relancer avec --enregistre")
+    if regressions:
+        print(f"❌ {len(regressions)} régression(s)")
+    if manquants or regressions:
+        sys.exit(1)
+    print("✅ Aucune régression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import csv
+import os
+import re
+import time
+from functools import lru_cache
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+FICHIER_SYNONYMES = "files/synonymes_substances.csv"  # Terme;Canonique (déjà normalisés)
+FICHIER_AMM = "files/liste_des_amms.csv"              # pour l'évaluation hors ligne
+
+# DCI absente côté ARP ("nan" une fois passée en texte) : pas de recherche floue
+VALEURS_MANQUANTES = {"", "NAN", "NONE", "NULL", "-"}
+
+# Termes anglais (ou fautes fréquentes) -> terme français utilisé par la BDPM
+TERMES_EN_FR = {
+    "HYDROCHLORIDE": "CHLORHYDRATE",
+    "HYROCHLORIDE": "CHLORHYDRATE",
+    "HCL": "CHLORHYDRATE",
+    "DIHYDROCHLORIDE": "DICHLORHYDRATE",
+    "HYDROBROMIDE": "BROMHYDRATE",
+    "SULPHATE": "SULFATE",
+    "MESYLATE": "MESILATE",
+    "BESYLATE": "BESILATE",
+    "BROMIDE": "BROMURE",
+    "BUTYLBROMIDE": "BUTYLBROMURE",
+    "CHLORIDE": "CHLORURE",
+    "IODIDE": "IODURE",
+    "OXIDE": "OXYDE",
+    "HYDROXIDE": "HYDROXYDE",
+}
+
+# Cations en suffixe : "DICLOFENAC SODIUM" -> "DICLOFENAC SODIQUE"
+CATIONS_EN_FR = {
+    "SODIUM": "SODIQUE",
+    "POTASSIUM": "POTASSIQUE",
+    "CALCIUM": "CALCIQUE",
+    "MAGNESIUM": "MAGNESIQUE",
+}
+
+# Sels / esters placés en tête par la BDPM : "CHLORHYDRATE DE X"
+SELS = {
+    "CHLORHYDRATE", "DICHLORHYDRATE", "BROMHYDRATE", "SULFATE", "PHOSPHATE",
+    "TETRAPHOSPHATE", "ACETATE", "MALEATE", "FUMARATE", "SUCCINATE", "CITRATE",
+    "TARTRATE", "MESILATE", "BESILATE", "PROPIONATE", "DIPROPIONATE", "FUROATE",
+    "XINAFOATE", "GLUCONATE", "DIGLUCONATE", "BUTYLBROMURE", "BROMURE", "CHLORURE",
+    "NITRATE", "LACTATE", "VALERATE", "ACETONIDE", "HYCLATE", "PALMITATE",
+    "STEARATE", "BENZOATE", "CARBONATE", "HEMIFUMARATE", "TOSILATE",
+}
+
+# Qualificatifs retirés de la forme canonique (hydratation, "BASE"...)
+QUALIFICATIFS = {
+    "ANHYDRE", "HYDRATE", "HYDRATEE", "MONOHYDRATE", "MONOHYDRATEE", "DIHYDRATE",
+    "DIHYDRATEE", "TRIHYDRATE", "TRIHYDRATEE", "TETRAHYDRATE", "PENTAHYDRATE",
+    "PENTAHYDRATEE", "HEXAHYDRATE", "HEPTAHYDRATE", "HEMIHYDRATE", "SESQUIHYDRATE",
+    "DESSECHE", "BASE",
+}
+
+# Suffixes retirés pour obtenir la molécule de base
+SUFFIXES_BASE = {
+    "SODIQUE", "DISODIQUE", "MONOSODIQUE", "POTASSIQUE", "CALCIQUE", "MAGNESIQUE",
+    "DISOPROXIL", "CILEXETIL", "MOFETIL", "AXETIL",
+}
+
+RE_SEL_PARENTHESES = re.compile(r"^(?P<base>[^()]+?) ?\( ?(?P<sel>[A-Z][A-Z0-9 ]*?) DE? ?\)$")
+RE_PARENTHESES = re.compile(r"^(?P<avant>[^()]+?) ?\((?P<dedans>[^()]+)\)$")
+RE_ELISION = re.compile(r"^(?P<sel>[A-Z]+) D (?=[A-Z])")
+
+# Ions trop ambigus pour servir de molécule de base ("CALCIUM" -> quel sel ?)
+IONS = {
+    "SODIUM", "POTASSIUM", "CALCIUM", "MAGNESIUM", "FER", "ZINC", "ALUMINIUM",
+    "AMMONIUM", "LITHIUM", "CUIVRE",
+}
+
+
+# =========================
+# SYNONYMES
+# =========================
+
+@lru_cache(maxsize=None)
+def _synonymes(fichier: str = FICHIER_SYNONYMES):
+    """(table terme -> canonique, regex compilée des termes, plus longs d'abord)."""
+    table = {}
+    if os.path.exists(fichier):
+        with open(fichier, newline="", encoding="utf-8") as f:
+            for ligne in csv.DictReader(f, delimiter=";"):
+                table[ligne["Terme"].strip()] = ligne["Canonique"].strip()
+    if not table:
+        return table, None
+    motif = "|".join(re.escape(t) for t in sorted(table, key=len, reverse=True))
+    return table, re.compile(rf"(?<![A-Z0-9])(?:{motif})(?![A-Z0-9])")
+
+
+def applique_synonymes(s: str) -> str:
+    table, regex = _synonymes()
+    if regex is None:
+        return s
+    return regex.sub(lambda m: table[m.group(0)], s)
+
+
+# =========================
+# CANONISATION
+# =========================
+
+def est_manquante(norm: str) -> bool:
+    return norm.strip() in VALEURS_MANQUANTES
+
+
+def _canonise(s: str):
+    """Retourne (forme canonique "SEL DE X", molécule de base X)."""
+    jetons = re.findall(r"\(|\)|[^\s()]+", s)
+    jetons = [TERMES_EN_FR.get(j, j) for j in jetons if j not in QUALIFICATIFS]
+
+    # Acides en anglais : "FOLIC ACID" -> "ACIDE FOLIQUE"
+    if len(jetons) > 1 and jetons[-1] == "ACID":
+        jetons = ["ACIDE"] + [j[:-2] + "IQUE" if j.endswith("IC") else j for j in jetons[:-1]]
+
+    # Cation en suffixe : "DICLOFENAC SODIUM" / "DICLOFENAC DE SODIUM" -> "DICLOFENAC SODIQUE"
+    # (mais pas "CHLORURE DE SODIUM")
+    if len(jetons) > 1 and jetons[-1] in CATIONS_EN_FR and jetons[0] not in SELS:
+        if jetons[-2] not in ("DE", "D"):
+            jetons[-1] = CATIONS_EN_FR[jetons[-1]]
+        elif len(jetons) > 2:
+            jetons[-2:] = [CATIONS_EN_FR[jetons[-1]]]
+
+    forme = applique_synonymes(" ".join(jetons))
+
+    # "X (CHLORHYDRATE DE)" -> "CHLORHYDRATE DE X"
+    m = RE_SEL_PARENTHESES.match(forme)
+    if m:
+        forme = f"{m.group('sel')} DE {m.group('base')}"
+
+    # "CHLORHYDRATE D ALFUZOSINE" -> "CHLORHYDRATE DE ALFUZOSINE"
+    m = RE_ELISION.match(forme)
+    if m and m.group("sel") in SELS:
+        forme = f"{m.group('sel')} DE {forme[m.end():]}"
+
+    # "DOPAMINE CHLORHYDRATE" -> "CHLORHYDRATE DE DOPAMINE"
+    jetons = forme.split()
+    if len(jetons) > 1 and jetons[-1] in SELS and jetons[-2] not in ("DE", "D"):
+        forme = f"{jetons[-1]} DE {' '.join(jetons[:-1])}"
+
+    # Molécule de base : sans sel en tête ni cation / ester en suffixe
+    jetons = forme.split()
+    if len(jetons) > 2 and jetons[0] in SELS and jetons[1] == "DE":
+        jetons = jetons[2:]
+    while len(jetons) > 1 and jetons[-1] in SUFFIXES_BASE:
+        jetons = jetons[:-1]
+    base = " ".join(jetons)
+
+    return forme, "" if base in IONS else base
+
+
+@lru_cache(maxsize=65536)
+def formes_canoniques(norm: str) -> tuple:
+    """
+    Clés de recherche d'un libellé déjà passé par normalise_chaine, de la plus
+    précise (forme canonique) à la plus large (molécule de base).
+    """
+    s = " ".join(norm.replace("’", " ").split())
+    if est_manquante(s):
+        return ()
+
+    # "PARACETAMOL (ACETAMINOPHENE)" : chaque partie est une variante
+    variantes = [s]
+    m = RE_PARENTHESES.match(s)
+    if m and not RE_SEL_PARENTHESES.match(s):
+        variantes = [m.group("avant").strip(), m.group("dedans").strip()]
+
+    canonisees = [_canonise(v) for v in variantes]
+    cles = [forme for forme, _ in canonisees] + [base for _, base in canonisees]
+    return tuple(dict.fromkeys(c for c in cles if c))
+
+
+def compile_index(dict_exact: dict) -> dict:
+    """
+    Table unique clé -> (Code_substance, Libelle_substance) construite depuis le
+    dictionnaire exact de COMPO. Priorité : libellés exacts, puis formes
+    canoniques, puis molécules de base ; à égalité, le premier code rencontré.
+    """
+    index = dict(dict_exact)
+    formes = {nom: formes_canoniques(nom) for nom in dict_exact}
+    for nom, valeur in dict_exact.items():
+        if formes[nom]:
+            index.setdefault(formes[nom][0], valeur)
+    for nom, valeur in dict_exact.items():
+        for cle in formes[nom][1:]:
+            index.setdefault(cle, valeur)
+    return index
+
+
+def cherche_canonique(norm: str, index: dict):
+    for cle in formes_canoniques(norm):
+        valeur = index.get(cle)
+        if valeur is not None:
+            return valeur
+    return None
+
+
+# =========================
+# ÉVALUATION (avant / après)
+# =========================
+
+def evalue(fichier_amm: str = FICHIER_AMM, fichier_compo: str = None):
+    """Taux de rapprochement et durée sans puis avec la canonisation."""
+    import pandas as pd
+
+    import parse_amm_bdpm
+
+    df_amm = pd.read_csv(fichier_amm, encoding="utf-8-sig")
+    col_dci = parse_amm_bdpm.find_col_by_pattern(df_amm, ["dci"])
+    substances = (
+        df_amm[col_dci].astype(str).str.split("/").explode().fillna("").str.strip()
+    )
+    requetes = [parse_amm_bdpm.normalise_chaine(s) for s in substances if s]
+
+    dict_exact = parse_amm_bdpm.construit_dict_substances(
+        parse_amm_bdpm.lit_compo(fichier_compo or parse_amm_bdpm.FICHIER_COMPO)
+    )
+    noms = list(dict_exact)
+
+    for libelle, index in (("sans canonisation", None), ("avec canonisation", compile_index(dict_exact))):
+        formes_canoniques.cache_clear()
+        comptes = {"exact": 0, "canonique": 0, "flou": 0, "non_trouve": 0}
+        debut = time.perf_counter()
+        for q in requetes:
+            *_, methode = parse_amm_bdpm.rapproche_substance(q, dict_exact, noms, index)
+            comptes[methode] += 1
+        duree = time.perf_counter() - debut
+        trouves = len(requetes) - comptes["non_trouve"]
+        print(
+            f"{libelle:<20} {trouves / len(requetes):6.1%} rapprochées en {duree:6.2f} s  "
+            + "  ".join(f"{k}={v}" for k, v in comptes.items())
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évalue la canonisation des substances")
+    parser.add_argument("--amm", default=FICHIER_AMM, help="CSV de la liste ARP (colonne DCI)")
+    parser.add_argument("--compo", default=None, help="fichier CIS_COMPO_bdpm.txt")
+    args = parser.parse_args()
+    evalue(args.amm, args.compo)
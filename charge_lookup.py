@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import string
+import time
+
+from service_lookup import HOTE, PORT, Index
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+# Noms de substances envoyés : exacts, avec une faute de frappe, ou inconnus.
+# Les deux derniers passent par le repli flou : sans eux le p99 ne mesure
+# que le chemin exact.
+PART_NOMS_FAUTES = 0.2
+PART_NOMS_INCONNUS = 0.1
+
+
+# =========================
+# TEST DE CHARGE (localhost)
+# =========================
+
+def _percentile(valeurs, p):
+    valeurs = sorted(valeurs)
+    if not valeurs:
+        return 0.0
+    k = min(len(valeurs) - 1, int(round(p / 100 * (len(valeurs) - 1))))
+    return valeurs[k]
+
+
+def _avec_faute(nom: str) -> str:
+    """Une lettre supprimée, doublée ou remplacée."""
+    if len(nom) < 4:
+        return nom + "e"
+    i = random.randrange(1, len(nom) - 1)
+    faute = random.choice(("suppression", "doublement", "remplacement"))
+    if faute == "suppression":
+        return nom[:i] + nom[i + 1:]
+    if faute == "doublement":
+        return nom[:i] + nom[i] + nom[i:]
+    return nom[:i] + random.choice(string.ascii_lowercase) + nom[i + 1:]
+
+
+def _nom_inconnu() -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=random.randint(6, 14)))
+
+
+def tire_noms(noms, k):
+    tires = []
+    for nom in random.choices(noms, k=k):
+        tirage = random.random()
+        if tirage < PART_NOMS_INCONNUS:
+            tires.append(_nom_inconnu())
+        elif tirage < PART_NOMS_INCONNUS + PART_NOMS_FAUTES:
+            tires.append(_avec_faute(nom.lower()))
+        else:
+            tires.append(nom.lower())
+    return tires
+
+
+def prepare_requetes(index: Index, taille_batch: int, nb: int):
+    """Batches (route, corps JSON) tirés des données réellement chargées."""
+    codes = index.codes_tries or ["0016070"]
+    substances = list(index.produits_par_substance) or ["42215"]
+    noms = index.noms_substances or ["AMOXICILLINE"]
+
+    requetes = []
+    for i in range(nb):
+        choix = i % 3
+        if choix == 0:
+            corps = {"codes": random.choices(codes, k=taille_batch)}
+            route = "/codes"
+        elif choix == 1:
+            corps = {"substances": random.choices(substances, k=taille_batch)}
+            route = "/substances/produits"
+        else:
+            corps = {"noms": tire_noms(noms, taille_batch)}
+            route = "/substances/nom"
+        requetes.append((route, json.dumps(corps).encode("utf-8")))
+    return requetes
+
+
+async def client(hote, port, requetes, latences_ms, latences_serveur_us):
+    reader, writer = await asyncio.open_connection(hote, port)
+    try:
+        for route, corps in requetes:
+            debut = time.perf_counter()
+            writer.write(
+                f"POST {route} HTTP/1.1\r\nHost: {hote}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(corps)}\r\n\r\n"
+                .encode("latin-1") + corps
+            )
+            await writer.drain()
+
+            await reader.readline()  # ligne de statut
+            longueur = 0
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b""):
+                    break
+                nom, _, valeur = h.decode("latin-1").partition(":")
+                if nom.strip().lower() == "content-length":
+                    longueur = int(valeur)
+            reponse = json.loads(await reader.readexactly(longueur))
+
+            latences_ms.setdefault(route, []).append((time.perf_counter() - debut) * 1000)
+            if reponse.get("nb"):
+                latences_serveur_us.append(reponse["duree_us"] / reponse["nb"])
+    finally:
+        writer.close()
+
+
+async def lance(hote, port, requetes, nb_clients):
+    latences_ms, latences_serveur_us = {}, []
+    parts = [requetes[i::nb_clients] for i in range(nb_clients)]
+    debut = time.perf_counter()
+    await asyncio.gather(
+        *(client(hote, port, p, latences_ms, latences_serveur_us) for p in parts)
+    )
+    return time.perf_counter() - debut, latences_ms, latences_serveur_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du service de recherche")
+    parser.add_argument("--hote", default=HOTE)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--dossier", default=".", help="CSV utilisés pour tirer les requêtes")
+    parser.add_argument("--requetes", type=int, default=3000)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    index = Index(args.dossier)
+    requetes = prepare_requetes(index, args.batch, args.requetes)
+
+    duree, lat_routes, lat_us = asyncio.run(lance(args.hote, args.port, requetes, args.clients))
+    lat_ms = [ms for latences in lat_routes.values() for ms in latences]
+
+    nb_lookups = args.requetes * args.batch
+    print(f"\n{args.requetes} requêtes x {args.batch} lookups, {args.clients} clients : {duree:.2f} s")
+    print(f"  Débit         : {nb_lookups / duree:,.0f} lookups/s")
+    print(
+        f"  Requête (ms)  : p50={statistics.median(lat_ms):.3f} "
+        f"p99={_percentile(lat_ms, 99):.3f}"
+    )
+    for route, latences in sorted(lat_routes.items()):
+        print(
+            f"    {route:<22}: p50={statistics.median(latences):.3f} "
+            f"p99={_percentile(latences, 99):.3f}"
+        )
+    print(
+        f"  Lookup serveur (µs) : p50={statistics.median(lat_us):.2f} "
+        f"p99={_percentile(lat_us, 99):.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
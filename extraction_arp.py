@@ -0,0 +1,276 @@
+import csv
+import io
+import re
+from urllib.parse import urljoin
+
+import pandas as pd
+import requests
+from lxml import etree, html as lxml_html
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+URL_ARP = "https://arp.sn/liste-des-amms/"
+
+# Le tableau AMM est celui dont l'en-tête contient un nom ET une DCI
+MOTIFS_TABLE_AMM = (("nom",), ("dci",))
+
+# Attributs de <table> pouvant pointer vers un endpoint JSON DataTables
+ATTRIBUTS_AJAX = ("data-ajax-url", "data-ajax", "data-url", "data-source")
+
+TAILLE_PAGE_AJAX = 1000
+
+# Début de page lu pour trouver <meta charset> quand le serveur n'annonce rien
+TAILLE_SONDE_CHARSET = 4096
+RE_CHARSET_META = re.compile(rb"<meta[^>]+charset=[\"']?([A-Za-z0-9_.:-]+)", re.I)
+NB_PAGES_MAX = 500  # garde-fou contre une pagination qui boucle
+
+
+# =========================
+# EXTRACTION EN STREAMING
+# =========================
+
+def _texte(elem) -> str:
+    return " ".join("".join(elem.itertext()).split())
+
+
+def _entete_correspond(entetes, motifs) -> bool:
+    """
+    Vrai si chaque groupe de motifs trouve sa propre cellule d'en-tête : une
+    cellule unique qui contiendrait "nom" et "dci" (tableau de mise en page
+    englobant le vrai tableau) ne suffit pas.
+    """
+    entetes = [e.lower() for e in entetes]
+    if len(entetes) < max(2, len(motifs)):
+        return False
+    candidats = [
+        {i for i, e in enumerate(entetes) if any(m in e for m in groupe)} for groupe in motifs
+    ]
+
+    def affecte(k, pris):
+        if k == len(candidats):
+            return True
+        return any(affecte(k + 1, pris | {i}) for i in candidats[k] - pris)
+
+    return affecte(0, frozenset())
+
+
+def _encodage_declare(resp):
+    """Charset de l'en-tête HTTP, sinon None (voir _encodage_page)."""
+    if "charset=" in resp.headers.get("Content-Type", "").lower():
+        return resp.encoding
+    return None
+
+
+class _FluxPrefixe:
+    """Flux dont les premiers octets ont déjà été lus pour sonder le charset."""
+
+    def __init__(self, prefixe: bytes, flux):
+        self.prefixe = prefixe
+        self.flux = flux
+
+    def read(self, n=-1):
+        if not self.prefixe:
+            return self.flux.read(n)
+        if n is None or n < 0:
+            donnees, self.prefixe = self.prefixe + self.flux.read(), b""
+        else:
+            donnees, self.prefixe = self.prefixe[:n], self.prefixe[n:]
+        return donnees
+
+
+def _encodage_page(flux, encodage_http=None):
+    """(flux, charset) : en-tête HTTP, sinon balise meta, sinon UTF-8."""
+    if encodage_http:
+        return flux, encodage_http
+    prefixe = flux.read(TAILLE_SONDE_CHARSET)
+    m = RE_CHARSET_META.search(prefixe)
+    return _FluxPrefixe(prefixe, flux), m.group(1).decode("ascii") if m else "utf-8"
+
+
+class ExtracteurTableAMM:
+    """
+    Parcourt une page HTML avec lxml.iterparse et ne construit que les lignes du
+    tableau dont l'en-tête correspond aux motifs. Les autres éléments sont
+    libérés au fil de l'eau.
+
+    Après épuisement de `lignes()`, `page_suivante` et `url_ajax` indiquent
+    s'il faut suivre une pagination serveur ou un endpoint DataTables. Seul un
+    lien "next" placé après le tableau retenu est pris comme page suivante.
+
+    `encoding` : charset annoncé par le serveur ; None le cherche dans la
+    balise meta de la page, à défaut UTF-8.
+    """
+
+    def __init__(self, flux, url_base: str = URL_ARP, motifs=MOTIFS_TABLE_AMM, encoding=None):
+        self.flux = flux
+        self.url_base = url_base
+        self.motifs = motifs
+        self.encoding = encoding
+        self.entetes = None
+        self.page_suivante = None
+        self.url_ajax = None
+        self.nb_lignes = 0
+
+    def lignes(self):
+        profondeur_table = 0    # profondeur des <table> imbriquées
+        table_cible = None      # profondeur de la table candidate
+        attrs_table = {}
+        dans_cellule = 0
+        cellules = []
+        trouve = False
+
+        flux, encodage = _encodage_page(self.flux, self.encoding)
+        for evenement, elem in etree.iterparse(
+            flux, events=("start", "end"), html=True, encoding=encodage
+        ):
+            tag = elem.tag if isinstance(elem.tag, str) else ""
+
+            if evenement == "start":
+                if tag == "table":
+                    profondeur_table += 1
+                    # Une table ouverte avant la ligne d'en-tête de la candidate
+                    # (table de mise en page) la remplace comme candidate
+                    if not trouve and (table_cible is None or self.entetes is None):
+                        table_cible = profondeur_table
+                        attrs_table = dict(elem.attrib)
+                        self.entetes = None
+                        cellules = []
+                elif tag in ("td", "th"):
+                    dans_cellule += 1
+                continue
+
+            # --- événements "end" ---
+            en_cible = table_cible is not None and profondeur_table == table_cible
+
+            if tag in ("td", "th"):
+                dans_cellule -= 1
+                if en_cible:
+                    cellules.append(_texte(elem))
+
+            elif tag == "tr" and en_cible:
+                if self.entetes is None:
+                    if _entete_correspond(cellules, self.motifs):
+                        self.entetes = cellules
+                    else:
+                        # mauvaise table : ses lignes sont ignorées, une table
+                        # imbriquée plus loin peut encore être retenue
+                        table_cible = None
+                elif any(cellules):
+                    ligne = dict(zip(self.entetes, cellules))
+                    self.nb_lignes += 1
+                    yield ligne
+                cellules = []
+
+            elif tag == "table":
+                if en_cible:
+                    trouve = True
+                    table_cible = None
+                    self.url_ajax = next(
+                        (attrs_table[a] for a in ATTRIBUTS_AJAX if attrs_table.get(a)), None
+                    )
+                    if self.url_ajax:
+                        self.url_ajax = urljoin(self.url_base, self.url_ajax)
+                profondeur_table -= 1
+
+            elif tag in ("a", "link") and trouve and self.page_suivante is None:
+                rel = (elem.get("rel") or "").lower().split()
+                classes = (elem.get("class") or "").lower().split()
+                if elem.get("href") and ("next" in rel or "next" in classes):
+                    self.page_suivante = urljoin(self.url_base, elem.get("href"))
+
+            # Libère la mémoire (sauf à l'intérieur d'une cellule en cours de lecture)
+            if not dans_cellule:
+                elem.clear(keep_tail=True)
+                parent = elem.getparent()
+                if parent is not None:
+                    while elem.getprevious() is not None:
+                        del parent[0]
+
+
+def iter_lignes_datatables(session, url_ajax, entetes, verify=False, timeout=60):
+    """Lit un endpoint JSON DataTables (côté serveur) page par page."""
+    debut = 0
+    for _ in range(NB_PAGES_MAX):
+        resp = session.get(
+            url_ajax,
+            params={"draw": 1, "start": debut, "length": TAILLE_PAGE_AJAX},
+            verify=verify,
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        donnees = resp.json()
+        lignes = donnees.get("data", donnees.get("aaData", []))
+        if not lignes:
+            return
+        for ligne in lignes:
+            if isinstance(ligne, dict):
+                valeurs = ligne
+            else:
+                valeurs = dict(zip(entetes or range(len(ligne)), ligne))
+            yield {
+                k: _texte(lxml_html.fromstring(v)) if isinstance(v, str) and "<" in v else v
+                for k, v in valeurs.items()
+            }
+        debut += len(lignes)
+        total = donnees.get("recordsFiltered", donnees.get("recordsTotal"))
+        if total is not None and debut >= int(total):
+            return
+
+
+def iter_lignes_arp(url: str = URL_ARP, verify=False, timeout=60, session=None):
+    """
+    Génère les lignes (dict colonne -> texte) du tableau AMM de l'ARP en suivant
+    la pagination serveur et, si la page l'annonce, l'endpoint DataTables. Une
+    réponse qui n'est pas du HTML est lue comme un CSV séparé par ";".
+    """
+    session = session or requests.Session()
+    vues = set()
+    entetes = None
+
+    for _ in range(NB_PAGES_MAX):
+        if url is None or url in vues:
+            break
+        vues.add(url)
+
+        print(f"Téléchargement de {url} ...")
+        with session.get(url, verify=verify, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            type_contenu = resp.headers.get("Content-Type", "").lower()
+            if type_contenu and "html" not in type_contenu:
+                print(f"→ Contenu {type_contenu}, lecture en CSV (;)")
+                lecteur = csv.DictReader(io.StringIO(resp.text), delimiter=";")
+                yield from lecteur
+                entetes = lecteur.fieldnames
+                break
+            resp.raw.decode_content = True
+            extracteur = ExtracteurTableAMM(
+                resp.raw, url_base=url, encoding=_encodage_declare(resp)
+            )
+            yield from extracteur.lignes()
+
+        if extracteur.entetes is None:
+            # Page sans tableau AMM : on ne suit pas ses liens "next"
+            break
+        entetes = extracteur.entetes
+        if extracteur.url_ajax and extracteur.nb_lignes == 0:
+            print(f"→ Tableau alimenté en JSON : {extracteur.url_ajax}")
+            yield from iter_lignes_datatables(
+                session, extracteur.url_ajax, entetes, verify=verify, timeout=timeout
+            )
+            break
+        url = extracteur.page_suivante
+
+    if entetes is None:
+        raise ValueError("Aucun tableau AMM (nom + DCI) trouvé sur la page ARP.")
+
+
+def extrait_table_arp(
+    url: str = URL_ARP, verify=False, timeout=60, session=None
+) -> pd.DataFrame:
+    """DataFrame du tableau AMM ; cellules vides -> NaN comme avec pd.read_html."""
+    df = pd.DataFrame(
+        list(iter_lignes_arp(url, verify=verify, timeout=timeout, session=session))
+    )
+    return df.replace("", float("nan"))
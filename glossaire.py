@@ -0,0 +1,231 @@
+import argparse
+import csv
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+FICHIER_GLOSSAIRE = "files/glossaire_icdo3.csv"  # Terme;Traduction;Categorie;Genre
+
+# Séparateurs conservés tels quels ; chaque morceau entre deux est un segment
+RE_SEPARATEURS = re.compile(r"([,()])")
+
+# Codes et nombres recopiés tels quels ("C34.1", "8140/3", "C000-C006,C008-C009")
+RE_INVARIANT = re.compile(r"^[A-Za-z]?\d[\d./-]*[A-Za-z]?\d*$")
+
+# "de ovaire" -> "d'ovaire" (pas devant h : "de Hodgkin")
+RE_ELISION = re.compile(r"\b([dDlL])[eEaA] (?=[aeiouyéèêàâîôœAEIOUYÉÈÊÀÂÎÔŒ])")
+
+GENRES = ("m", "f", "mp", "fp")
+
+
+# =========================
+# GLOSSAIRE
+# =========================
+
+@dataclass(frozen=True)
+class Entree:
+    """
+    Une ligne du glossaire. Categorie :
+    - nom        : noyau du groupe nominal, porte le genre (m, f, mp, fp)
+    - adj        : placé après le nom et accordé ("masc|fém" ou "m|f|mp|fp")
+    - complement : placé après le nom, invariable ("giant cell" -> "à cellules géantes")
+    - fixe       : traduit sur place ("NOS" -> "SAI", "of" -> "de")
+    """
+    formes: tuple
+    categorie: str
+    genre: str = "m"
+
+
+def _pluriel(mot: str) -> str:
+    if mot.endswith(("s", "x", "z")):
+        return mot
+    if mot.endswith("al"):
+        return mot[:-2] + "aux"
+    return mot + "s"
+
+
+@lru_cache(maxsize=None)
+def charge_glossaire(fichier: str = FICHIER_GLOSSAIRE):
+    """(table tuple de mots anglais -> Entree, nombre max de mots d'un terme)."""
+    table = {}
+    with open(fichier, newline="", encoding="utf-8") as f:
+        for ligne in csv.DictReader(f, delimiter=";"):
+            formes = tuple(ligne["Traduction"].split("|"))
+            if ligne["Categorie"] == "adj":
+                if len(formes) == 1:
+                    formes = formes * 2
+                if len(formes) == 2:
+                    formes += tuple(_pluriel(x) for x in formes)
+            table[tuple(ligne["Terme"].lower().split())] = Entree(
+                formes, ligne["Categorie"], ligne["Genre"] or "m"
+            )
+    return table, max(map(len, table), default=0)
+
+
+# =========================
+# TRADUCTION
+# =========================
+
+def _decoupe(segment: str, table: dict, longueur_max: int):
+    """Plus long terme connu d'abord ; retourne (entrées, mots inconnus)."""
+    originaux = segment.split()
+    mots = [m.lower() for m in originaux]
+    entrees, inconnus = [], []
+    i = 0
+    while i < len(mots):
+        for n in range(min(longueur_max, len(mots) - i), 0, -1):
+            entree = table.get(tuple(mots[i:i + n]))
+            if entree is not None:
+                entrees.append(entree)
+                i += n
+                break
+        else:
+            if RE_INVARIANT.match(originaux[i]):
+                entrees.append(Entree((originaux[i],), "fixe"))
+            else:
+                inconnus.append(mots[i])
+            i += 1
+    return entrees, inconnus
+
+
+def _accorde(entree: Entree, genre: str) -> str:
+    if entree.categorie == "adj":
+        return entree.formes[GENRES.index(genre)]
+    return entree.formes[0]
+
+
+def _compose(entrees: list, genre: str):
+    """
+    Ordre français : le nom d'abord, puis ses modificateurs anglais pris à
+    rebours ("large cell neuroendocrine carcinoma" -> "carcinome
+    neuroendocrinien à grandes cellules"). Retourne (texte, genre du noyau,
+    c.-à-d. le premier nom) ou (None, genre) si l'ordre est ambigu.
+    """
+    mots, modificateurs = [], []
+    nom_precedent = False
+    noyau = None
+    for entree in entrees:
+        if entree.categorie in ("adj", "complement"):
+            modificateurs.append(entree)
+        elif entree.categorie == "nom":
+            if nom_precedent and not modificateurs:
+                return None, genre          # "kidney tumor" : nom + nom
+            noyau = noyau or entree.genre
+            mots.append(entree.formes[0])
+            mots += [_accorde(m, entree.genre) for m in reversed(modificateurs)]
+            modificateurs = []
+            nom_precedent = True
+        else:
+            if modificateurs:
+                return None, genre          # "giant cell and spindle cell ..."
+            mots.append(entree.formes[0])
+            nom_precedent = False
+
+    # Adjectifs sans nom qui suit ("Epithelioma, malignant") : accord avec le noyau
+    genre = noyau or genre
+    mots += [_accorde(m, genre) for m in modificateurs]
+    return " ".join(mots), genre
+
+
+def _casse(source: str, traduction: str) -> str:
+    if source.isupper():
+        return traduction.upper()
+    if source[:1].isupper():
+        return traduction[:1].upper() + traduction[1:]
+    return traduction
+
+
+def est_invariant(texte: str) -> bool:
+    """Libellé fait uniquement de codes / nombres : rien à traduire, glossaire ou non."""
+    mots = [
+        m
+        for morceau in RE_SEPARATEURS.split(texte)
+        if not RE_SEPARATEURS.fullmatch(morceau)
+        for m in morceau.split()
+    ]
+    return bool(mots) and all(RE_INVARIANT.match(m) for m in mots)
+
+
+def traduit(texte: str, fichier: str = FICHIER_GLOSSAIRE):
+    """
+    Traduction locale d'un libellé ICD-O-3. Retourne (traduction, mots inconnus) ;
+    traduction vaut None dès qu'un mot manque au glossaire ou que l'ordre des mots
+    est ambigu : le libellé part alors au traducteur réseau.
+    """
+    table, longueur_max = charge_glossaire(fichier)
+    sortie, inconnus = [], []
+    genre = "m"
+    complet = True
+    for morceau in RE_SEPARATEURS.split(texte):
+        segment = morceau.strip()
+        if not segment or RE_SEPARATEURS.fullmatch(segment):
+            sortie.append(morceau)
+            continue
+
+        entrees, manquants = _decoupe(segment, table, longueur_max)
+        if manquants:
+            inconnus += manquants
+            complet = False
+            continue
+        traduction, genre = _compose(entrees, genre)
+        if traduction is None:
+            complet = False
+            continue
+
+        debut = morceau[:len(morceau) - len(morceau.lstrip())]
+        fin = morceau[len(morceau.rstrip()):]
+        sortie.append(debut + _casse(segment, traduction) + fin)
+
+    if not complet:
+        return None, inconnus
+    return RE_ELISION.sub(lambda m: m.group(1) + "'", "".join(sortie)), inconnus
+
+
+# =========================
+# COUVERTURE D'UN CLASSEUR
+# =========================
+
+def couverture(fichier_xlsx: str, nb_inconnus: int = 30):
+    """
+    Part des libellés distincts traduits localement (hors codes seuls, recopiés
+    tels quels) et mots manquants les plus fréquents.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(fichier_xlsx)
+    textes = {
+        v.strip()
+        for c in df.columns
+        for v in df[c] if isinstance(v, str) and v.strip()
+    }
+    codes = {t for t in textes if est_invariant(t)}
+    textes -= codes
+    manquants = Counter()
+    nb_locaux = 0
+    for t in textes:
+        traduction, inconnus = traduit(t)
+        nb_locaux += traduction is not None
+        manquants.update(inconnus)
+
+    print(f"{nb_locaux}/{len(textes)} libellés distincts traduits localement "
+          f"({nb_locaux / max(len(textes), 1):.1%}), {len(codes)} codes seuls ignorés")
+    for mot, n in manquants.most_common(nb_inconnus):
+        print(f"  {n:5d}  {mot}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Traduction ICD-O-3 par glossaire local")
+    parser.add_argument("textes", nargs="*", help="libellés anglais à traduire")
+    parser.add_argument("--xlsx", default=None, help="mesure la couverture d'un classeur")
+    args = parser.parse_args()
+
+    for t in args.textes:
+        traduction, inconnus = traduit(t)
+        print(f"{t} -> {traduction if traduction is not None else f'(réseau : {inconnus})'}")
+    if args.xlsx:
+        couverture(args.xlsx)
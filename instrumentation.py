@@ -0,0 +1,256 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+DOSSIER_RAPPORTS = "rapports"
+
+# Dossier lu par le collecteur textfile de node_exporter (sinon DOSSIER_RAPPORTS)
+DOSSIER_PROMETHEUS = os.environ.get("PROMETHEUS_TEXTFILE_DIR", DOSSIER_RAPPORTS)
+
+PREFIXE_METRIQUES = "scrpits"
+NB_LIGNES_PROFIL = 20
+QUANTILES = (0.5, 0.9, 0.99)  # quantiles exportés par les résumés (durées par page...)
+
+
+# =========================
+# RAPPORT DE RUN
+# =========================
+
+def _echappe(valeur) -> str:
+    """Échappement des valeurs de labels Prometheus."""
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _quantile(valeurs_triees, q):
+    k = min(len(valeurs_triees) - 1, int(round(q * (len(valeurs_triees) - 1))))
+    return valeurs_triees[k]
+
+
+class Rapport:
+    """Durées / mémoire par étape et compteurs d'un lancement de script."""
+
+    def __init__(self, script: str, profil: bool = False, dossier: str = DOSSIER_RAPPORTS):
+        self.script = script
+        self.profil = profil
+        self.dossier = dossier
+        self.debut = time.perf_counter()
+        self.horodatage = datetime.now()
+        self.etapes = []
+        self.compteurs = []
+        self.resumes = []
+        self.details = []
+        if profil and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _prefixe_fichier(self) -> str:
+        return os.path.join(
+            self.dossier, f"{self.script}_{self.horodatage.strftime('%Y%m%d-%H%M%S')}"
+        )
+
+    @contextmanager
+    def etape(self, nom: str):
+        info = {"etape": nom}
+        profileur = None
+        if self.profil:
+            tracemalloc.reset_peak()
+            avant = tracemalloc.take_snapshot()
+            profileur = cProfile.Profile()
+            profileur.enable()
+        debut = time.perf_counter()
+        try:
+            yield info
+        finally:
+            info["duree_s"] = round(time.perf_counter() - debut, 6)
+            if profileur is not None:
+                profileur.disable()
+                os.makedirs(self.dossier, exist_ok=True)
+                chemin_prof = f"{self._prefixe_fichier()}_{nom}.prof"
+                profileur.dump_stats(chemin_prof)
+                flux = io.StringIO()
+                pstats.Stats(profileur, stream=flux).sort_stats("cumulative").print_stats(
+                    NB_LIGNES_PROFIL
+                )
+                info["profil"] = chemin_prof
+                info["profil_top"] = flux.getvalue()
+
+                info["memoire_pic_octets"] = tracemalloc.get_traced_memory()[1]
+                diff = tracemalloc.take_snapshot().compare_to(avant, "lineno")
+                info["memoire_top"] = [str(stat) for stat in diff[:10]]
+            self.etapes.append(info)
+            print(f"[RAPPORT] {nom} : {info['duree_s']:.2f} s")
+
+    def compte(self, nom: str, valeur, **labels):
+        self.compteurs.append({"nom": nom, "valeur": valeur, "labels": labels})
+
+    def resume(self, nom: str, valeurs, **labels):
+        """Nombre, somme, extrêmes et quantiles d'une série de mesures (durée par page...)."""
+        valeurs = sorted(valeurs)
+        if not valeurs:
+            return
+        self.resumes.append({
+            "nom": nom,
+            "labels": labels,
+            "nb": len(valeurs),
+            "somme": round(sum(valeurs), 6),
+            "min": round(valeurs[0], 6),
+            "max": round(valeurs[-1], 6),
+            "quantiles": {str(q): round(_quantile(valeurs, q), 6) for q in QUANTILES},
+        })
+
+    def detail(self, nom: str, **champs):
+        """Ligne de détail (un document, un fichier...) : JSON seulement, pas de série Prometheus."""
+        self.details.append({"nom": nom, **champs})
+
+    def en_dict(self) -> dict:
+        return {
+            "script": self.script,
+            "date": self.horodatage.isoformat(timespec="seconds"),
+            "duree_totale_s": round(time.perf_counter() - self.debut, 6),
+            "profil": self.profil,
+            "etapes": self.etapes,
+            "compteurs": self.compteurs,
+            "resumes": self.resumes,
+            "details": self.details,
+        }
+
+    def en_prometheus(self) -> str:
+        def labels(**kv):
+            return ",".join(f'{k}="{_echappe(v)}"' for k, v in kv.items())
+
+        p = PREFIXE_METRIQUES
+        lignes = [
+            f"# HELP {p}_run_duree_secondes Durée totale du dernier lancement.",
+            f"# TYPE {p}_run_duree_secondes gauge",
+            f"{p}_run_duree_secondes{{{labels(script=self.script)}}} "
+            f"{time.perf_counter() - self.debut:.6f}",
+            f"# HELP {p}_run_horodatage_secondes Fin du dernier lancement (epoch).",
+            f"# TYPE {p}_run_horodatage_secondes gauge",
+            f"{p}_run_horodatage_secondes{{{labels(script=self.script)}}} {time.time():.0f}",
+            f"# HELP {p}_etape_duree_secondes Durée de chaque étape.",
+            f"# TYPE {p}_etape_duree_secondes gauge",
+        ]
+        for e in self.etapes:
+            lignes.append(
+                f"{p}_etape_duree_secondes{{{labels(script=self.script, etape=e['etape'])}}} "
+                f"{e['duree_s']}"
+            )
+        if any("memoire_pic_octets" in e for e in self.etapes):
+            lignes += [
+                f"# HELP {p}_etape_memoire_pic_octets Pic mémoire Python (tracemalloc).",
+                f"# TYPE {p}_etape_memoire_pic_octets gauge",
+            ]
+            for e in self.etapes:
+                if "memoire_pic_octets" in e:
+                    lignes.append(
+                        f"{p}_etape_memoire_pic_octets"
+                        f"{{{labels(script=self.script, etape=e['etape'])}}} "
+                        f"{e['memoire_pic_octets']}"
+                    )
+        lignes += [
+            f"# HELP {p}_compteur Comptages du lancement (lignes, rapprochements, pages...).",
+            f"# TYPE {p}_compteur gauge",
+        ]
+        for c in self.compteurs:
+            lignes.append(
+                f"{p}_compteur{{{labels(script=self.script, nom=c['nom'], **c['labels'])}}} "
+                f"{c['valeur']}"
+            )
+        for nom in dict.fromkeys(r["nom"] for r in self.resumes):
+            lignes += [
+                f"# HELP {p}_{nom} Résumé par série de mesures (quantiles, somme, nombre).",
+                f"# TYPE {p}_{nom} summary",
+            ]
+            for r in self.resumes:
+                if r["nom"] != nom:
+                    continue
+                base = dict(script=self.script, **r["labels"])
+                for q, v in r["quantiles"].items():
+                    lignes.append(f"{p}_{nom}{{{labels(**base, quantile=q)}}} {v}")
+                lignes.append(f"{p}_{nom}_sum{{{labels(**base)}}} {r['somme']}")
+                lignes.append(f"{p}_{nom}_count{{{labels(**base)}}} {r['nb']}")
+        return "\n".join(lignes) + "\n"
+
+    def ecrit(self):
+        """Écrit le rapport JSON horodaté et le fichier .prom (remplacé atomiquement)."""
+        os.makedirs(self.dossier, exist_ok=True)
+        chemin_json = f"{self._prefixe_fichier()}.json"
+        with open(chemin_json, "w", encoding="utf-8") as f:
+            json.dump(self.en_dict(), f, ensure_ascii=False, indent=2)
+
+        os.makedirs(DOSSIER_PROMETHEUS, exist_ok=True)
+        chemin_prom = os.path.join(DOSSIER_PROMETHEUS, f"{PREFIXE_METRIQUES}_{self.script}.prom")
+        with open(chemin_prom + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.en_prometheus())
+        os.replace(chemin_prom + ".tmp", chemin_prom)
+
+        print(f"[RAPPORT] {chemin_json} / {chemin_prom}")
+        return chemin_json
+
+
+# =========================
+# API MODULE (utilisée par les scripts)
+# =========================
+
+_rapport = None
+
+
+def demarre(script: str, profil: bool = False) -> Rapport:
+    global _rapport
+    _rapport = Rapport(script, profil=profil)
+    return _rapport
+
+
+def termine():
+    global _rapport
+    if _rapport is None:
+        return None
+    chemin = _rapport.ecrit()
+    _rapport = None
+    return chemin
+
+
+@contextmanager
+def etape(nom: str):
+    """Chronomètre un bloc ; sans rapport démarré, ne fait rien."""
+    if _rapport is None:
+        yield {}
+        return
+    with _rapport.etape(nom) as info:
+        yield info
+
+
+def compte(nom: str, valeur, **labels):
+    """Enregistre un comptage ; sans rapport démarré, ne fait rien."""
+    if _rapport is not None:
+        _rapport.compte(nom, valeur, **labels)
+
+
+def resume(nom: str, valeurs, **labels):
+    """Enregistre le résumé d'une série de mesures ; sans rapport démarré, ne fait rien."""
+    if _rapport is not None:
+        _rapport.resume(nom, valeurs, **labels)
+
+
+def detail(nom: str, **champs):
+    """Enregistre une ligne de détail du rapport JSON ; sans rapport démarré, ne fait rien."""
+    if _rapport is not None:
+        _rapport.detail(nom, **champs)
+
+
+def ajoute_option_profil(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="cProfile + tracemalloc par étape (fichiers .prof dans rapports/)",
+    )
+    return parser
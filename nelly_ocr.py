@@ -1,62 +1,389 @@
+import argparse
+import glob
+import hashlib
+import os
+import sqlite3
+import time
 import pytesseract
 import fitz  # PyMuPDF
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 from PIL import Image
 import io
 
+import instrumentation
+
 # --- CONFIGURATION ---
 # Windows (si nécessaire) :
 # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
-def pdf_to_html_ocr(pdf_path, html_path, dpi=300, lang="eng+fra"):
-    pdf_path = Path(pdf_path)
-    html_path = Path(html_path)
+# --- MODE LOT ---
+FICHIER_ETAT_OCR = "ocr_jobs.sqlite"   # état des pages (reprise après arrêt)
+MEMOIRE_PAR_WORKER = 400 * 1024 ** 2   # page A4 à 300 DPI + tesseract, estimation large
+TACHES_PAR_WORKER = 2                  # pages en file par worker
 
-    print("Ouverture du PDF...")
-    doc = fitz.open(str(pdf_path))
 
+def ocr_page(doc, i, mat, lang):
+    page = doc.load_page(i)
+    pix = page.get_pixmap(matrix=mat, alpha=False)
+
+    # Pixmap -> PIL Image (sans fichiers temporaires)
+    img_bytes = pix.tobytes("png")
+    image = Image.open(io.BytesIO(img_bytes))
+
+    return pytesseract.image_to_string(image, lang=lang)
+
+
+def page_html(i, text):
+    clean_text = (
+        text.replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace("\n", "<br>")
+    )
+
+    return (
+        "<div style='margin-bottom: 40px; border-bottom: 1px solid #ccc;'>"
+        f"<h2 style='color: #2c3e50;'>Page {i+1}</h2>"
+        f"<p>{clean_text}</p>"
+        "</div>"
+    )
+
+
+def ecrit_html(html_path, textes):
     html_parts = [
         "<html><body style='font-family: sans-serif; line-height: 1.6; padding: 20px;'>"
     ]
+    html_parts += [page_html(i, text) for i, text in enumerate(textes)]
+    html_parts.append("</body></html>")
+
+    html_path = Path(html_path)
+    html_path.parent.mkdir(parents=True, exist_ok=True)
+    html_path.write_text("\n".join(html_parts), encoding="utf-8")
+
+
+def pdf_to_html_ocr(pdf_path, html_path, dpi=300, lang="eng+fra"):
+    pdf_path = Path(pdf_path)
+    html_path = Path(html_path)
 
     # Conversion DPI -> matrice de zoom (PyMuPDF travaille en 72 DPI par défaut)
     zoom = dpi / 72.0
     mat = fitz.Matrix(zoom, zoom)
 
-    total = doc.page_count
-    for i in range(total):
-        print(f"Traitement de la page {i+1}/{total}...")
+    print("Ouverture du PDF...")
+    textes = []
+    durees = []
+    with fitz.open(str(pdf_path)) as doc, instrumentation.etape("ocr"):
+        total = doc.page_count
+        for i in range(total):
+            print(f"Traitement de la page {i+1}/{total}...")
+            debut = time.perf_counter()
+            textes.append(ocr_page(doc, i, mat, lang))
+            durees.append(time.perf_counter() - debut)
 
-        page = doc.load_page(i)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
+    ecrit_html(html_path, textes)
+    instrumentation.compte("pages_ocr", total, document=pdf_path.name)
+    instrumentation.resume("ocr_page_duree_secondes", durees, document=pdf_path.name)
+    print(f"Terminé ! Fichier enregistré sous : {html_path}")
 
-        # Pixmap -> PIL Image (sans fichiers temporaires)
-        img_bytes = pix.tobytes("png")
-        image = Image.open(io.BytesIO(img_bytes))
 
-        text = pytesseract.image_to_string(image, lang=lang)
+# ------------------------
+#  Mode lot : file de pages + pool de workers tesseract
+# ------------------------
 
-        clean_text = (
-            text.replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-                .replace("\n", "<br>")
-        )
+def liste_pdfs(entrees):
+    """
+    Dossiers (parcourus récursivement), motifs glob ou fichiers -> {PDF absolu :
+    chemin relatif à son dossier d'entrée}, trié par PDF. Le chemin relatif
+    nomme la sortie : a/rapport.pdf et b/rapport.pdf ne s'écrasent pas.
+    """
+    pdfs = {}
+    for entree in entrees:
+        if os.path.isdir(entree):
+            trouves = glob.glob(os.path.join(entree, "**", "*.pdf"), recursive=True)
+            trouves += glob.glob(os.path.join(entree, "**", "*.PDF"), recursive=True)
+            for p in trouves:
+                pdfs.setdefault(os.path.abspath(p), os.path.relpath(p, entree))
+        else:
+            for p in glob.glob(entree):
+                pdfs.setdefault(os.path.abspath(p), os.path.basename(p))
+    return dict(sorted(pdfs.items()))
 
-        html_parts.append(
-            "<div style='margin-bottom: 40px; border-bottom: 1px solid #ccc;'>"
-            f"<h2 style='color: #2c3e50;'>Page {i+1}</h2>"
-            f"<p>{clean_text}</p>"
-            "</div>"
-        )
 
-    html_parts.append("</body></html>")
+def chemins_html(pdfs, dossier_sortie):
+    """
+    PDF -> HTML de sortie (arborescence d'entrée conservée). Si deux entrées
+    donnent encore le même nom (même fichier sous deux dossiers d'entrée),
+    un hash du chemin complet les départage.
+    """
+    def nom(relatif, pdf=None):
+        base = os.path.splitext(relatif)[0]
+        if pdf is not None:
+            base += "_" + hashlib.sha1(pdf.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(dossier_sortie, f"{base}_ocr.html")
+
+    occurrences = {}
+    for relatif in pdfs.values():
+        cle = os.path.normcase(nom(relatif))
+        occurrences[cle] = occurrences.get(cle, 0) + 1
+    return {
+        pdf: nom(relatif, pdf if occurrences[os.path.normcase(nom(relatif))] > 1 else None)
+        for pdf, relatif in pdfs.items()
+    }
+
+
+def memoire_disponible():
+    """Mémoire disponible en octets (Linux), None si inconnue."""
+    try:
+        with open("/proc/meminfo") as f:
+            for ligne in f:
+                if ligne.startswith("MemAvailable:"):
+                    return int(ligne.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def nb_workers_auto():
+    coeurs = os.cpu_count() or 1
+    memoire = memoire_disponible()
+    if memoire is None:
+        return coeurs
+    return max(1, min(coeurs, memoire // MEMOIRE_PAR_WORKER))
+
+
+def ouvre_etat(chemin=FICHIER_ETAT_OCR):
+    con = sqlite3.connect(chemin)
+    con.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            pdf TEXT PRIMARY KEY,
+            taille INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            nb_pages INTEGER NOT NULL,
+            html TEXT NOT NULL,
+            statut TEXT NOT NULL DEFAULT 'en_cours'
+        );
+        CREATE TABLE IF NOT EXISTS pages (
+            pdf TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            statut TEXT NOT NULL DEFAULT 'a_faire',
+            texte TEXT,
+            erreur TEXT,
+            duree_s REAL,
+            PRIMARY KEY (pdf, page)
+        );
+        """
+    )
+    return con
+
+
+def enregistre_documents(con, pdfs, dossier_sortie, reessayer_erreurs=False):
+    """
+    Inscrit les documents et leurs pages ; un PDF modifié repart de zéro. Un PDF
+    illisible est marqué 'erreur' (sans pages) et le lot continue.
+    """
+    for pdf, html in chemins_html(pdfs, dossier_sortie).items():
+        try:
+            st = os.stat(pdf)
+        except OSError as exc:
+            print(f"  !! {pdf} : {exc!r}")
+            continue
+        ligne = con.execute(
+            "SELECT taille, mtime, statut FROM documents WHERE pdf = ?", (pdf,)
+        ).fetchone()
+        if ligne is not None and ligne[:2] == (st.st_size, st.st_mtime):
+            if not (ligne[2] == "erreur" and reessayer_erreurs):
+                # Sortie renommée (ancien nom sans sous-dossier) : un document déjà
+                # fait repasse 'en_cours' et son HTML est réécrit depuis les textes stockés
+                with con:
+                    con.execute(
+                        "UPDATE documents SET html = ?, statut = CASE statut "
+                        "WHEN 'fait' THEN 'en_cours' ELSE statut END "
+                        "WHERE pdf = ? AND html != ?",
+                        (html, pdf, html),
+                    )
+                continue
+
+        try:
+            with fitz.open(pdf) as doc:
+                nb_pages = doc.page_count
+            statut = "en_cours"
+        except Exception as exc:
+            print(f"  !! {Path(pdf).name} illisible : {exc!r}")
+            nb_pages, statut = 0, "erreur"
+        with con:
+            con.execute("DELETE FROM pages WHERE pdf = ?", (pdf,))
+            con.execute(
+                "INSERT OR REPLACE INTO documents (pdf, taille, mtime, nb_pages, html, statut) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pdf, st.st_size, st.st_mtime, nb_pages, html, statut),
+            )
+            con.executemany(
+                "INSERT INTO pages (pdf, page) VALUES (?, ?)",
+                [(pdf, i) for i in range(nb_pages)],
+            )
+
+
+def _ocr_tache(pdf, i, dpi, lang):
+    """Exécuté dans un worker : OCR d'une page, retourne (texte, durée)."""
+    # Ouvrir le PDF coûte quelques ms, l'OCR d'une page plusieurs secondes :
+    # on ne garde aucun document ouvert entre deux tâches
+    zoom = dpi / 72.0
+    with fitz.open(pdf) as doc:
+        debut = time.perf_counter()
+        texte = ocr_page(doc, i, fitz.Matrix(zoom, zoom), lang)
+    return texte, time.perf_counter() - debut
+
+
+def finalise_documents(con):
+    """Écrit le HTML des documents dont toutes les pages sont faites ; retourne leur nb de pages."""
+    prets = con.execute(
+        """
+        SELECT d.pdf, d.html, d.nb_pages FROM documents d
+        WHERE d.statut = 'en_cours'
+          AND NOT EXISTS (SELECT 1 FROM pages p WHERE p.pdf = d.pdf AND p.statut != 'fait')
+        """
+    ).fetchall()
+    nb_pages_finies = []
+    for pdf, html, nb_pages in prets:
+        textes = [
+            t for (t,) in con.execute(
+                "SELECT texte FROM pages WHERE pdf = ? ORDER BY page", (pdf,)
+            )
+        ]
+        ecrit_html(html, textes)
+        with con:
+            con.execute("UPDATE documents SET statut = 'fait' WHERE pdf = ?", (pdf,))
+        # Détail par document dans le JSON seulement : en Prometheus, une série par
+        # fichier grossirait à chaque lot et a/x.pdf, b/x.pdf y seraient des doublons
+        instrumentation.detail("document_ocr", pdf=pdf, html=html, pages=nb_pages)
+        nb_pages_finies.append(nb_pages)
+        print(f"✅ {Path(pdf).name} -> {html}")
+    return nb_pages_finies
+
+
+def ocr_lot(entrees, dossier_sortie="data", dpi=300, lang="eng+fra",
+            workers=None, chemin_etat=FICHIER_ETAT_OCR, reessayer_erreurs=False):
+    """
+    OCR de plusieurs PDF. Les pages sont distribuées à un pool de processus
+    tesseract ; chaque page terminée est enregistrée dans la base d'état, si bien
+    qu'un lot interrompu reprend là où il s'était arrêté.
+    """
+    pdfs = liste_pdfs(entrees)
+    print(f"{len(pdfs)} PDF trouvés")
+    if not pdfs:
+        return
+
+    con = ouvre_etat(chemin_etat)
+    try:
+        enregistre_documents(con, pdfs, dossier_sortie, reessayer_erreurs)
+        pdfs = list(pdfs)
+        statuts = ("a_faire", "erreur") if reessayer_erreurs else ("a_faire",)
+        marques = ",".join("?" * len(pdfs))
+        taches = con.execute(
+            f"SELECT pdf, page FROM pages WHERE statut IN ({','.join('?' * len(statuts))}) "
+            f"AND pdf IN ({marques}) ORDER BY pdf, page",
+            (*statuts, *pdfs),
+        ).fetchall()
+
+        workers = workers or nb_workers_auto()
+        deja = con.execute(
+            f"SELECT COUNT(*) FROM pages WHERE statut = 'fait' AND pdf IN ({marques})", pdfs
+        ).fetchone()[0]
+        print(f"{len(taches)} pages à traiter ({deja} déjà faites), {workers} workers")
+
+        file_max = workers * TACHES_PAR_WORKER
+        restantes = iter(taches)
+        en_cours = {}
+        nb_faites = 0
+        durees = []
+        finis_docs = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Remplir la file sans dépasser file_max pages en vol
+                for pdf, page in restantes:
+                    en_cours[pool.submit(_ocr_tache, pdf, page, dpi, lang)] = (pdf, page)
+                    if len(en_cours) >= file_max:
+                        break
+                if not en_cours:
+                    break
+
+                finis, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for futur in finis:
+                    pdf, page = en_cours.pop(futur)
+                    try:
+                        texte, duree = futur.result()
+                    except Exception as exc:
+                        print(f"  !! {Path(pdf).name} page {page+1} : {exc!r}")
+                        with con:
+                            con.execute(
+                                "UPDATE pages SET statut = 'erreur', erreur = ? "
+                                "WHERE pdf = ? AND page = ?",
+                                (repr(exc), pdf, page),
+                            )
+                        continue
+                    with con:
+                        con.execute(
+                            "UPDATE pages SET statut = 'fait', texte = ?, erreur = NULL, duree_s = ? "
+                            "WHERE pdf = ? AND page = ?",
+                            (texte, duree, pdf, page),
+                        )
+                    nb_faites += 1
+                    durees.append(duree)
+                    print(f"  {Path(pdf).name} page {page+1} ({nb_faites}/{len(taches)})")
+
+                finis_docs += finalise_documents(con)
+
+        finis_docs += finalise_documents(con)
+        nb_erreurs = con.execute(
+            f"SELECT COUNT(*) FROM pages WHERE statut = 'erreur' AND pdf IN ({marques})", pdfs
+        ).fetchone()[0]
+        docs_erreur = con.execute(
+            f"SELECT COUNT(*) FROM documents WHERE statut = 'erreur' AND pdf IN ({marques})", pdfs
+        ).fetchone()[0]
+        instrumentation.compte("documents_ocr", len(finis_docs))
+        instrumentation.compte("pages_ocr", sum(finis_docs))
+        instrumentation.compte("pages_erreur", nb_erreurs)
+        instrumentation.compte("documents_erreur", docs_erreur)
+        instrumentation.resume("ocr_page_duree_secondes", durees)
+        if nb_erreurs:
+            print(f"{nb_erreurs} pages en erreur (relancer avec --reessayer)")
+        if docs_erreur:
+            print(f"{docs_erreur} PDF illisibles (relancer avec --reessayer)")
+    finally:
+        con.close()
 
-    html_path.parent.mkdir(parents=True, exist_ok=True)
-    html_path.write_text("\n".join(html_parts), encoding="utf-8")
-    print(f"Terminé ! Fichier enregistré sous : {html_path}")
 
 if __name__ == "__main__":
-    pdf_file = "files/nelly1.pdf"
-    html_file = "data/nelly_ocr.html"
-    pdf_to_html_ocr(pdf_file, html_file, dpi=300, lang="eng+fra")
+    parser = argparse.ArgumentParser(description="OCR de PDF scannés vers HTML")
+    parser.add_argument(
+        "entrees", nargs="*",
+        help="dossiers, motifs glob ou PDF (mode lot) ; sans argument : files/nelly1.pdf",
+    )
+    parser.add_argument("--sortie", default="data", help="dossier des HTML (mode lot)")
+    parser.add_argument("--workers", type=int, default=None, help="défaut : selon cœurs et mémoire")
+    parser.add_argument("--etat", default=FICHIER_ETAT_OCR, help="base SQLite de reprise")
+    parser.add_argument("--reessayer", action="store_true", help="relance les pages en erreur")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--lang", default="eng+fra")
+    args = instrumentation.ajoute_option_profil(parser).parse_args()
+
+    instrumentation.demarre("nelly_ocr", profil=args.profile)
+    try:
+        if args.entrees:
+            with instrumentation.etape("lot"):
+                ocr_lot(
+                    args.entrees, args.sortie, dpi=args.dpi, lang=args.lang,
+                    workers=args.workers, chemin_etat=args.etat,
+                    reessayer_erreurs=args.reessayer,
+                )
+        else:
+            pdf_file = "files/nelly1.pdf"
+            html_file = "data/nelly_ocr.html"
+            pdf_to_html_ocr(pdf_file, html_file, dpi=args.dpi, lang=args.lang)
+    finally:
+        instrumentation.termine()
@@ -1,11 +1,19 @@
-import warnings
+import argparse
+import json
+import os
+import sqlite3
 import unicodedata
+from datetime import datetime
 from difflib import get_close_matches
 
 import pandas as pd
-import requests
 import urllib3
 
+import instrumentation
+from canonisation import cherche_canonique, compile_index, est_manquante
+from extraction_arp import extrait_table_arp
+from sorties import ecrit_sorties
+
 
 # =========================
 # PARAMÈTRES
@@ -19,6 +27,38 @@ FICHIER_MEDICAMENTS = "codes_medicaments.csv"
 FICHIER_SUBSTANCES_NON_TROUVEES = "substances_non_trouvees_detail.csv"
 FICHIER_SUBSTANCES_NON_TROUVEES_UNIQUES = "substances_non_trouvees_unique.csv"
 
+# Registre persistant nom -> Code_ARP (les codes déjà attribués ne bougent plus).
+# Il est versionné dans le dépôt avec les sorties publiées : le committer avec
+# codes_medicaments.csv après chaque run. S'il manque (clone sans le fichier,
+# suppression), il est reconstruit à partir de codes_medicaments.csv.
+FICHIER_REGISTRE_ARP = "registre_codes_arp.sqlite"
+
+# Mode changeset : ajouts / suppressions / modifications par rapport au run précédent
+DOSSIER_CHANGESETS = "changesets"
+
+# Clés de ligne utilisées pour comparer chaque sortie avec sa version précédente
+# (uniques dans chaque sortie : un même Code_substance peut porter deux libellés,
+# une même substance peut venir de deux DCI brutes)
+CLES_SORTIES = {
+    FICHIER_SUBSTANCES: ["Code_ARP", "Code_substance", "Libelle_substance"],
+    FICHIER_MEDICAMENTS: ["Code_ARP", "Libelle_medicament"],
+    FICHIER_SUBSTANCES_NON_TROUVEES: [
+        "Code_ARP", "Libelle_medicament", "Substance_texte", "DCI_brute"
+    ],
+    FICHIER_SUBSTANCES_NON_TROUVEES_UNIQUES: ["Substance_norm", "Substance_texte"],
+}
+
+COLS_COMPO = [
+    "Code_CIS",
+    "Designation_element",
+    "Code_substance",
+    "Libelle_substance",
+    "Dosage_substance",
+    "Reference_dosage",
+    "Nature_composant",
+    "Num_liaison",
+]
+
 NB_CHIFFRES_CODE = 6  # ARP000001, ARP000002, ...
 
 
@@ -49,33 +89,304 @@ def find_col_by_pattern(df, patterns):
     raise KeyError(f"Aucune colonne ne correspond aux patterns : {patterns}")
 
 
-def main():
+def lit_compo(fichier: str = FICHIER_COMPO) -> pd.DataFrame:
+    return pd.read_csv(
+        fichier,
+        sep="\t",
+        header=None,
+        names=COLS_COMPO,
+        encoding="latin-1",
+    )
+
+
+def construit_dict_substances(df_compo: pd.DataFrame) -> dict:
+    """Libellé normalisé -> (Code_substance, Libelle_substance)."""
+    # On garde tout (SA, FT, etc.) pour ne pas perdre AMOXICILLINE & co
+    df_compo = df_compo.assign(
+        Libelle_norm=df_compo["Libelle_substance"].map(normalise_chaine)
+    )
+
+    df_substances = (
+        df_compo
+        .sort_values("Code_substance")
+        .drop_duplicates(subset=["Libelle_norm"])
+        .loc[:, ["Libelle_norm", "Code_substance", "Libelle_substance"]]
+        .reset_index(drop=True)
+    )
+
+    return {
+        row["Libelle_norm"]: (row["Code_substance"], row["Libelle_substance"])
+        for _, row in df_substances.iterrows()
+    }
+
+
+def rapproche_substance(
+    norm_name: str, dict_exact: dict, all_norm_names, index_canonique=None, cutoff: float = 0.8
+):
+    """
+    Retourne (Code_substance, Libelle_substance, méthode) avec méthode parmi
+    "exact", "canonique", "flou" et "non_trouve".
+    """
+    # 1) exact
+    if norm_name in dict_exact:
+        return (*dict_exact[norm_name], "exact")
+    # 2) forme canonique (sels, termes anglais, synonymes) : table compilée
+    if index_canonique is not None:
+        trouve = cherche_canonique(norm_name, index_canonique)
+        if trouve is not None:
+            return (*trouve, "canonique")
+        if est_manquante(norm_name):
+            return (None, None, "non_trouve")
+    # 3) flou
+    matches = get_close_matches(norm_name, all_norm_names, n=1, cutoff=cutoff)
+    if matches:
+        best = matches[0]
+        return (*dict_exact[best], "flou")
+    return (None, None, "non_trouve")
+
+
+def match_substance(
+    norm_name: str, dict_exact: dict, all_norm_names, cutoff: float = 0.8, index_canonique=None
+):
+    code_sub, lib_sub, _ = rapproche_substance(
+        norm_name, dict_exact, all_norm_names, index_canonique, cutoff
+    )
+    return (code_sub, lib_sub)
+
+
+def formate_code_arp(num: int) -> str:
+    return f"ARP{num:0{NB_CHIFFRES_CODE}d}"
+
+
+def registre_vide(chemin_registre: str = FICHIER_REGISTRE_ARP) -> bool:
+    if not os.path.exists(chemin_registre):
+        return True
+    con = sqlite3.connect(chemin_registre)
+    try:
+        return con.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'registre_arp'"
+        ).fetchone() is None or con.execute(
+            "SELECT 1 FROM registre_arp LIMIT 1"
+        ).fetchone() is None
+    finally:
+        con.close()
+
+
+def amorce_registre(libelles_par_nom: dict, fichier: str = FICHIER_MEDICAMENTS) -> dict:
+    """
+    nom -> numéro repris d'un codes_medicaments.csv déjà publié, pour amorcer un
+    registre vide. Un nom n'est repris que si tous ses libellés publiés portent
+    le même Code_ARP et que ce code n'est pas déjà repris par un autre nom.
+    """
+    publie = lit_snapshot(fichier)
+    if publie is None:
+        return {}
+    code_par_libelle = dict(zip(publie["Libelle_medicament"], publie["Code_ARP"]))
+
+    amorce, pris = {}, set()
+    for nom, libelles in sorted(libelles_par_nom.items()):
+        codes = {code_par_libelle[l] for l in libelles if l in code_par_libelle}
+        if len(codes) != 1:
+            continue
+        code = codes.pop()
+        if code in pris or not code.startswith("ARP") or not code[3:].isdigit():
+            continue
+        amorce[nom] = int(code[3:])
+        pris.add(code)
+    return amorce
+
+
+def verifie_codes_publies(df_med: pd.DataFrame, fichier: str = FICHIER_MEDICAMENTS) -> int:
+    """Nombre de libellés dont le Code_ARP diffère du codes_medicaments.csv publié (avertit)."""
+    publie = lit_snapshot(fichier)
+    if publie is None:
+        return 0
+    fusion = publie[["Code_ARP", "Libelle_medicament"]].merge(
+        df_med[["Code_ARP", "Libelle_medicament"]].dropna().astype(str),
+        on="Libelle_medicament",
+        suffixes=("_publie", ""),
+    )
+    differents = fusion[fusion["Code_ARP_publie"] != fusion["Code_ARP"]]
+    if not differents.empty:
+        print(
+            f"⚠️  [REGISTRE] {len(differents)} libellés changent de Code_ARP par rapport à "
+            f"{fichier} (registre absent ou perdu ?), p.ex. :\n{differents.head().to_string()}"
+        )
+    return len(differents)
+
+
+def attribue_codes_arp(noms, chemin_registre: str = FICHIER_REGISTRE_ARP, amorce=None) -> dict:
+    """
+    Retourne le mapping nom -> Code_ARP en s'appuyant sur un registre SQLite.
+    Les noms déjà connus gardent leur code ; seuls les nouveaux noms reçoivent
+    un code, à la suite du plus grand numéro déjà attribué (ordre alphabétique).
+    Un registre vide est d'abord rempli avec `amorce` (nom -> numéro, voir
+    amorce_registre) ; sans amorce on retombe sur la numérotation historique :
+    noms triés, numérotés à partir de 1.
+    """
+    noms = sorted({str(n) for n in noms})
+
+    con = sqlite3.connect(chemin_registre)
+    try:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS registre_arp (
+                nom TEXT PRIMARY KEY,
+                num INTEGER NOT NULL UNIQUE
+            )
+            """
+        )
+        connus = dict(con.execute("SELECT nom, num FROM registre_arp"))
+        if not connus and amorce:
+            with con:
+                con.executemany(
+                    "INSERT INTO registre_arp (nom, num) VALUES (?, ?)", sorted(amorce.items())
+                )
+            connus = dict(amorce)
+            print(f"[REGISTRE] Registre vide : {len(amorce)} codes repris de {FICHIER_MEDICAMENTS}")
+        dernier = max(connus.values(), default=0)
+
+        nouveaux = [n for n in noms if n not in connus]
+        lignes = [(nom, dernier + i) for i, nom in enumerate(nouveaux, start=1)]
+        if lignes:
+            with con:
+                con.executemany(
+                    "INSERT INTO registre_arp (nom, num) VALUES (?, ?)", lignes
+                )
+            connus.update(lignes)
+    finally:
+        con.close()
+
+    print(f"[REGISTRE] {len(noms) - len(nouveaux)} codes ARP existants, {len(nouveaux)} nouveaux")
+    return {nom: formate_code_arp(connus[nom]) for nom in noms}
+
+
+def lit_snapshot(fichier: str):
+    """Relit une sortie précédente (tout en texte), ou None si elle n'existe pas."""
+    if not os.path.exists(fichier):
+        return None
+    return pd.read_csv(
+        fichier, sep=";", dtype=str, keep_default_na=False, encoding="utf-8-sig"
+    )
+
+
+def _verifie_cles_uniques(df, cles, version):
+    doublons = df[df.duplicated(subset=cles, keep=False)]
+    if not doublons.empty:
+        raise ValueError(
+            f"Clés {cles} non uniques dans la version {version} "
+            f"({len(doublons)} lignes), p.ex. :\n{doublons.head().to_string()}"
+        )
+
+
+def calcule_changeset(df_ancien, df_nouveau, cles):
+    """
+    Compare deux versions d'une sortie par jointure (hash) sur les clés de ligne.
+    Retourne (ajoutes, supprimes, modifies) ; les lignes modifiées portent les
+    nouvelles valeurs. Lève ValueError si les clés ne sont pas uniques (aucune
+    ligne n'est écartée en silence).
+    """
+    nouveau = df_nouveau.fillna("").astype(str)
+    _verifie_cles_uniques(nouveau, cles, "nouvelle")
+    if df_ancien is None or not set(cles) <= set(df_ancien.columns):
+        vide = nouveau.iloc[0:0]
+        return nouveau, vide, vide
+
+    autres = [c for c in nouveau.columns if c not in cles and c in df_ancien.columns]
+    ancien = df_ancien[cles + autres]
+    _verifie_cles_uniques(ancien, cles, "précédente")
+
+    fusion = ancien.merge(
+        nouveau, on=cles, how="outer", suffixes=("_avant", ""), indicator=True
+    )
+
+    ajoutes = fusion.loc[fusion["_merge"] == "right_only", list(nouveau.columns)]
+    supprimes = (
+        fusion.loc[fusion["_merge"] == "left_only", cles + [f"{c}_avant" for c in autres]]
+        .rename(columns={f"{c}_avant": c for c in autres})
+    )
+
+    communs = fusion[fusion["_merge"] == "both"]
+    masque = pd.Series(False, index=communs.index)
+    for c in autres:
+        masque |= communs[c] != communs[f"{c}_avant"]
+    modifies = communs.loc[masque, list(nouveau.columns)]
+
+    return (
+        ajoutes.reset_index(drop=True),
+        supprimes.reset_index(drop=True),
+        modifies.reset_index(drop=True),
+    )
+
+
+def ecrit_changesets(changesets: dict, dossier: str = DOSSIER_CHANGESETS) -> str:
+    """
+    Écrit les fichiers <sortie>_ajoutes / _supprimes / _modifies de chaque
+    sortie dans un sous-dossier horodaté, avec un manifest.json du run.
+    """
+    horodatage = datetime.now()
+    dossier_run = os.path.join(dossier, horodatage.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(dossier_run, exist_ok=True)
+
+    manifest = {
+        "date_run": horodatage.isoformat(timespec="seconds"),
+        "source": URL_ARP,
+        "sorties": {},
+    }
+
+    for fichier, (ajoutes, supprimes, modifies) in changesets.items():
+        base = os.path.splitext(os.path.basename(fichier))[0]
+        entree = {"cles": CLES_SORTIES[fichier], "fichiers": {}}
+        for nom, df in (("ajoutes", ajoutes), ("supprimes", supprimes), ("modifies", modifies)):
+            chemin = os.path.join(dossier_run, f"{base}_{nom}.csv")
+            df.to_csv(chemin, index=False, sep=";", encoding="utf-8-sig")
+            entree[nom] = len(df)
+            entree["fichiers"][nom] = chemin
+        manifest["sorties"][fichier] = entree
+        print(
+            f"  {fichier} : +{entree['ajoutes']} / -{entree['supprimes']} / ~{entree['modifies']}"
+        )
+
+    chemin_manifest = os.path.join(dossier_run, "manifest.json")
+    with open(chemin_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return dossier_run
+
+
+def ecrit_toutes_sorties(sorties: dict, changeset: bool = False):
+    """
+    Écrit les sorties {fichier: DataFrame}. En mode changeset, les quatre
+    comparaisons avec le run précédent sont faites et le changeset écrit avant
+    d'écraser la moindre sortie : une erreur (clés non uniques, écriture
+    Parquet / SQLite, Ctrl-C) laisse les sorties précédentes intactes, et le
+    run suivant compare toujours à la dernière version complète.
+    """
+    if changeset:
+        changesets = {
+            fichier: calcule_changeset(lit_snapshot(fichier), df, CLES_SORTIES[fichier])
+            for fichier, df in sorties.items()
+        }
+        print("\nChangeset par rapport au run précédent :")
+        dossier_run = ecrit_changesets(changesets)
+        print(f"✅ Changeset écrit dans : {dossier_run}")
+
+    for fichier, df in sorties.items():
+        ecrit_sorties(df, fichier, sep=";", encoding="utf-8-sig")
+        print(f"✅ Fichier créé : {fichier}")
+
+
+def main(changeset: bool = False):
+    # Sorties écrites ensemble à la fin (étape 8), après le changeset éventuel
+    sorties = {}
+
     # Désactiver les warnings SSL (verify=False à cause du certificat ARP)
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    # 1) Télécharger & parser la page ARP
-    print(f"Téléchargement de {URL_ARP} ...")
-    resp = requests.get(URL_ARP, verify=False, timeout=60)
-    resp.raise_for_status()
-    html = resp.text
-
-    print("Lecture des tableaux HTML ...")
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        tables = pd.read_html(html)
-
-    if not tables:
-        raise ValueError("Aucun tableau HTML trouvé sur la page ARP.")
-
-    # On prend le tableau qui a un nom + une DCI
-    df_arp = None
-    for t in tables:
-        cols = [c.lower() for c in t.columns.astype(str)]
-        if any("nom" in c for c in cols) and any("dci" in c for c in cols):
-            df_arp = t
-            break
-    if df_arp is None:
-        df_arp = tables[0]
+    # 1) Télécharger la page ARP et n'extraire que le tableau AMM (nom + DCI)
+    with instrumentation.etape("extraction_arp"):
+        df_arp = extrait_table_arp(URL_ARP, verify=False, timeout=60)
+    instrumentation.compte("lignes_arp", len(df_arp))
 
     print("Colonnes ARP :")
     print(df_arp.columns)
@@ -94,22 +405,6 @@ def main():
     print(f"Colonne Nom du Medicament = {col_nom}")
     print(f"Colonne DCI = {col_dci}")
 
-    # 2) Code ARP par médicament
-    noms_uniques = (
-        df_arp[col_nom]
-        .dropna()
-        .drop_duplicates()
-        .sort_values()
-        .reset_index(drop=True)
-    )
-
-    mapping_arp = {
-        nom: f"ARP{idx:0{NB_CHIFFRES_CODE}d}"
-        for idx, nom in enumerate(noms_uniques, start=1)
-    }
-
-    df_arp["Code_ARP"] = df_arp[col_nom].map(mapping_arp)
-
     # Libellé médicament = Nom + " - " + Conditionnement
     if "Conditionnement" in df_arp.columns:
         df_arp["Libelle_medicament"] = (
@@ -120,6 +415,28 @@ def main():
     else:
         df_arp["Libelle_medicament"] = df_arp[col_nom].astype(str).str.strip()
 
+    # 2) Code ARP par médicament (stable d'un lancement à l'autre via le registre ;
+    #    registre absent => amorcé depuis le codes_medicaments.csv publié)
+    noms_uniques = df_arp[col_nom].dropna().drop_duplicates()
+    premier_run = registre_vide(FICHIER_REGISTRE_ARP)
+    with instrumentation.etape("codes_arp"):
+        amorce = None
+        if premier_run:
+            amorce = amorce_registre(
+                df_arp.dropna(subset=[col_nom])
+                .groupby(df_arp[col_nom].astype(str))["Libelle_medicament"]
+                .agg(set)
+                .to_dict()
+            )
+        mapping_arp = attribue_codes_arp(noms_uniques, amorce=amorce)
+    instrumentation.compte("medicaments", len(mapping_arp))
+
+    df_arp["Code_ARP"] = df_arp[col_nom].map(
+        lambda nom: mapping_arp.get(str(nom)) if pd.notna(nom) else None
+    )
+    if premier_run:
+        instrumentation.compte("codes_arp_differents_publies", verifie_codes_publies(df_arp))
+
     # 3) Découper la DCI en substances (séparées par "/")
     df_arp["DCI_brute"] = df_arp[col_dci].astype(str)
 
@@ -143,59 +460,29 @@ def main():
 
     # 4) Charger COMPO et préparer le mapping substances
     print(f"Lecture COMPO : {FICHIER_COMPO}")
-    cols_compo = [
-        "Code_CIS",
-        "Designation_element",
-        "Code_substance",
-        "Libelle_substance",
-        "Dosage_substance",
-        "Reference_dosage",
-        "Nature_composant",
-        "Num_liaison",
-    ]
-
-    df_compo = pd.read_csv(
-        FICHIER_COMPO,
-        sep="\t",
-        header=None,
-        names=cols_compo,
-        encoding="latin-1",
-    )
-
-    # On garde tout (SA, FT, etc.) pour ne pas perdre AMOXICILLINE & co
-    df_compo["Libelle_norm"] = df_compo["Libelle_substance"].map(normalise_chaine)
-
-    df_substances = (
-        df_compo
-        .sort_values("Code_substance")
-        .drop_duplicates(subset=["Libelle_norm"])
-        .loc[:, ["Libelle_norm", "Code_substance", "Libelle_substance"]]
-        .reset_index(drop=True)
-    )
-
-    dict_exact = {
-        row["Libelle_norm"]: (row["Code_substance"], row["Libelle_substance"])
-        for _, row in df_substances.iterrows()
-    }
-    all_norm_names = list(dict_exact.keys())
-
-    def match_substance(norm_name: str, cutoff: float = 0.8):
-        # 1) exact
-        if norm_name in dict_exact:
-            return dict_exact[norm_name]
-        # 2) flou
-        matches = get_close_matches(norm_name, all_norm_names, n=1, cutoff=cutoff)
-        if matches:
-            best = matches[0]
-            return dict_exact[best]
-        return (None, None)
+    with instrumentation.etape("compo"):
+        df_compo = lit_compo(FICHIER_COMPO)
+        dict_exact = construit_dict_substances(df_compo)
+        all_norm_names = list(dict_exact.keys())
+        index_canonique = compile_index(dict_exact)
 
     codes = []
     labels = []
-    for norm_name in df_arp_sub["Substance_norm"]:
-        code_sub, lib_sub = match_substance(norm_name)
-        codes.append(code_sub)
-        labels.append(lib_sub)
+    comptes = {"exact": 0, "canonique": 0, "flou": 0, "non_trouve": 0}
+    with instrumentation.etape("rapprochement"):
+        for norm_name in df_arp_sub["Substance_norm"]:
+            code_sub, lib_sub, methode = rapproche_substance(
+                norm_name, dict_exact, all_norm_names, index_canonique
+            )
+            comptes[methode] += 1
+            codes.append(code_sub)
+            labels.append(lib_sub)
+    print(
+        f"Rapprochement : {comptes['exact']} exacts, {comptes['canonique']} canoniques, "
+        f"{comptes['flou']} flous, {comptes['non_trouve']} non trouvés"
+    )
+    for methode, nb in comptes.items():
+        instrumentation.compte("substances", nb, rapprochement=methode)
 
     df_arp_sub["Code_substance"] = codes
     df_arp_sub["Libelle_substance"] = labels
@@ -213,13 +500,13 @@ def main():
         .reset_index(drop=True)
     )
 
-    # Convert Code_substance to string and sort by Code_ARP
-    df_sub_out["Code_substance"] = df_sub_out["Code_substance"].astype(str)
+    # Code_substance en entier (nullable) : "901" et non "901.0" dans le CSV,
+    # colonne INTEGER / int64 dans SQLite et Parquet ; tri par Code_ARP
+    df_sub_out["Code_substance"] = pd.to_numeric(df_sub_out["Code_substance"]).astype("Int64")
     df_sub_out = df_sub_out.sort_values(by="Code_ARP", ascending=True)
 
 
-    df_sub_out.to_csv(FICHIER_SUBSTANCES, index=False, sep=";", encoding="utf-8-sig")
-    print(f"✅ Fichier substances créé : {FICHIER_SUBSTANCES}")
+    sorties[FICHIER_SUBSTANCES] = df_sub_out
 
     # =========================
     # 6) FICHIER 2 : MEDICAMENTS (Code_ARP + libellé complet)
@@ -230,8 +517,7 @@ def main():
         .reset_index(drop=True)
     )
 
-    df_med_out.to_csv(FICHIER_MEDICAMENTS, index=False, sep=";", encoding="utf-8-sig")
-    print(f"✅ Fichier médicaments créé : {FICHIER_MEDICAMENTS}")
+    sorties[FICHIER_MEDICAMENTS] = df_med_out
 
     # =========================
     # 7) FICHIERS NON TROUVÉS
@@ -255,13 +541,7 @@ def main():
         .reset_index(drop=True)
     )
 
-    df_unmatched_detail.to_csv(
-        FICHIER_SUBSTANCES_NON_TROUVEES,
-        index=False,
-        sep=";",
-        encoding="utf-8-sig",
-    )
-    print(f"✅ Fichier non trouvés (détail) : {FICHIER_SUBSTANCES_NON_TROUVEES}")
+    sorties[FICHIER_SUBSTANCES_NON_TROUVEES] = df_unmatched_detail
 
     # b) Vue unique : chaque Substance_norm non matchée + compteur
     df_unmatched_unique = (
@@ -272,13 +552,7 @@ def main():
         .reset_index(drop=True)
     )
 
-    df_unmatched_unique.to_csv(
-        FICHIER_SUBSTANCES_NON_TROUVEES_UNIQUES,
-        index=False,
-        sep=";",
-        encoding="utf-8-sig",
-    )
-    print(f"✅ Fichier non trouvés (unique) : {FICHIER_SUBSTANCES_NON_TROUVEES_UNIQUES}")
+    sorties[FICHIER_SUBSTANCES_NON_TROUVEES_UNIQUES] = df_unmatched_unique
 
     # petit aperçu
     print("\nAperçu substances matchées :")
@@ -286,6 +560,23 @@ def main():
     print("\nAperçu substances non trouvées (unique) :")
     print(df_unmatched_unique.head())
 
+    # =========================
+    # 8) CHANGESET (optionnel) PUIS ÉCRITURE DES SORTIES
+    # =========================
+    ecrit_toutes_sorties(sorties, changeset)
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Codes ARP et substances (BDPM)")
+    parser.add_argument(
+        "--changeset",
+        action="store_true",
+        help="écrit aussi les ajouts/suppressions/modifications vs le run précédent",
+    )
+    args = instrumentation.ajoute_option_profil(parser).parse_args()
+
+    instrumentation.demarre("parse_amm_bdpm", profil=args.profile)
+    try:
+        main(changeset=args.changeset)
+    finally:
+        instrumentation.termine()
@@ -1,7 +1,11 @@
+import argparse
 import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 
+import instrumentation
+from sorties import ecrit_sorties
+
 BASE_URL = "https://www.icd10data.com/ICD10PCS/Codes/Changes/Deleted_Codes/1?year={year}"
 
 
@@ -68,7 +72,9 @@ def main():
     all_dfs = []
 
     for year in YEARS:
-        df_year = fetch_deleted_pcs_codes(year)
+        with instrumentation.etape(f"annee_{year}"):
+            df_year = fetch_deleted_pcs_codes(year)
+        instrumentation.compte("codes_supprimes", len(df_year), annee=year)
         if df_year.empty:
             continue
 
@@ -86,10 +92,17 @@ def main():
     # CSV global toutes années confondues
     df_all = pd.concat(all_dfs, ignore_index=True)
     file_all = "deleted_icd10pcs_all_years.csv"
-    df_all.to_csv(file_all, index=False, encoding="utf-8")
+    ecrit_sorties(df_all, file_all, encoding="utf-8")
     print(f"\nFichier global créé : {file_all}")
     print(df_all.head())
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Codes ICD-10-PCS supprimés (icd10data.com)")
+    args = instrumentation.ajoute_option_profil(parser).parse_args()
+
+    instrumentation.demarre("parse_deleted_pcs", profil=args.profile)
+    try:
+        main()
+    finally:
+        instrumentation.termine()
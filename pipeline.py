@@ -0,0 +1,286 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# Ce module n'importe que la bibliothèque standard : pandas, fitz, langdetect,
+# deep_translator... ne sont chargés que par le processus qui exécute l'étape.
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+FICHIER_ETAT = ".pipeline_etat.json"
+
+
+@dataclass
+class Etape:
+    nom: str
+    script: str
+    entrees: list            # fichiers ou motifs glob
+    sorties: list
+    modules: list = field(default_factory=list)  # modules locaux importés par le script
+    distante: bool = False   # dépend d'un site web (non empreintable)
+
+
+ETAPES = [
+    Etape(
+        nom="icd10pcs",
+        script="parse_addenda.py",
+        entrees=["source/icd10pcs_order_*.txt", "source/index_addenda_*.txt"],
+        sorties=["icd10pcs_all_codes_labels.csv", "icd10pcs_deleted_with_labels.csv"],
+        modules=["sorties.py", "instrumentation.py"],
+    ),
+    Etape(
+        nom="arp_bdpm",
+        script="parse_amm_bdpm.py",
+        entrees=["files/CIS_COMPO_bdpm.txt", "files/synonymes_substances.csv"],
+        sorties=[
+            "substances_par_medicament.csv",
+            "codes_medicaments.csv",
+            "substances_non_trouvees_detail.csv",
+            "substances_non_trouvees_unique.csv",
+            "registre_codes_arp.sqlite",  # versionné : fixe les Code_ARP
+        ],
+        modules=["sorties.py", "extraction_arp.py", "canonisation.py", "instrumentation.py"],
+        distante=True,
+    ),
+    Etape(
+        nom="arp_site",
+        script="parse_amm_from_site.py",
+        entrees=[],
+        sorties=["liste_des_amms.csv"],
+        modules=["sorties.py", "extraction_arp.py", "instrumentation.py"],
+        distante=True,
+    ),
+    Etape(
+        nom="pcs_supprimes",
+        script="parse_deleted_pcs.py",
+        entrees=[],
+        sorties=["deleted_icd10pcs_all_years.csv"],
+        modules=["sorties.py", "instrumentation.py"],
+        distante=True,
+    ),
+    Etape(
+        nom="icdo3",
+        script="translate_icd-o3.py",
+        entrees=["source/sitetype.icdo3.d20220429 (1).xlsx", "files/glossaire_icdo3.csv"],
+        sorties=["files/sitetype.icdo3.d20220429.fr.xlsx"],
+        modules=["sorties.py", "glossaire.py", "instrumentation.py"],
+    ),
+    Etape(
+        nom="ocr",
+        script="nelly_ocr.py",
+        entrees=["files/nelly1.pdf"],
+        sorties=["data/nelly_ocr.html"],
+        modules=["instrumentation.py"],
+    ),
+]
+
+
+# =========================
+# GRAPHE & EMPREINTES
+# =========================
+
+def _fichiers(motifs):
+    fichiers = []
+    for motif in motifs:
+        if any(c in motif for c in "*?["):
+            fichiers.extend(sorted(glob.glob(motif)))
+        elif os.path.exists(motif):
+            fichiers.append(motif)
+    return fichiers
+
+
+def dependances(etapes):
+    """etape -> étapes dont une sortie figure parmi ses entrées."""
+    producteurs = {}
+    for e in etapes:
+        for s in e.sorties:
+            producteurs[os.path.normpath(s)] = e.nom
+    deps = {}
+    for e in etapes:
+        deps[e.nom] = {
+            producteurs[os.path.normpath(f)]
+            for f in e.entrees
+            if os.path.normpath(f) in producteurs and producteurs[os.path.normpath(f)] != e.nom
+        }
+    return deps
+
+
+def _hache_fichier(h, chemin: str):
+    if os.path.exists(chemin):
+        with open(chemin, "rb") as f:
+            for bloc in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloc)
+    else:
+        h.update(b"<absent>")
+
+
+def empreinte(etape: Etape) -> str:
+    """SHA-256 du script, de ses modules locaux et de tous ses fichiers d'entrée."""
+    h = hashlib.sha256()
+    for chemin in [etape.script, *etape.modules, *_fichiers(etape.entrees)]:
+        h.update(chemin.encode("utf-8"))
+        _hache_fichier(h, chemin)
+    return h.hexdigest()
+
+
+def empreintes_sorties(etape: Etape) -> dict:
+    """sortie -> SHA-256 de son contenu."""
+    empreintes = {}
+    for chemin in etape.sorties:
+        h = hashlib.sha256()
+        _hache_fichier(h, chemin)
+        empreintes[chemin] = h.hexdigest()
+    return empreintes
+
+
+def lit_etat(chemin: str = FICHIER_ETAT) -> dict:
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ecrit_etat(etat: dict, chemin: str = FICHIER_ETAT):
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(etat, f, indent=2, sort_keys=True)
+
+
+def est_a_jour(etape: Etape, etat: dict, distant: bool) -> bool:
+    if etape.distante and distant:
+        return False
+    if not all(os.path.exists(s) for s in etape.sorties):
+        return False
+    # Sorties comparées au contenu écrit par le dernier run réussi : une sortie
+    # éditée, régénérée à la main ou changée par un checkout fait reconstruire
+    precedent = etat.get(etape.nom, {})
+    return (
+        precedent.get("empreinte") == empreinte(etape)
+        and precedent.get("sorties") == empreintes_sorties(etape)
+    )
+
+
+# =========================
+# EXÉCUTION
+# =========================
+
+def execute_etape(script: str) -> float:
+    """Exécuté dans un processus fils : lance le script comme `python script`."""
+    debut = time.perf_counter()
+    sys.argv = [script]
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as exc:
+        # un SystemExit remonté tel quel casserait le pool de processus
+        if exc.code not in (None, 0):
+            raise RuntimeError(f"{script} s'est arrêté avec le code {exc.code}") from None
+    return time.perf_counter() - debut
+
+
+def lance(noms=None, force=False, distant=False, jobs=None):
+    """Retourne (durées des étapes reconstruites, étapes en échec ou ignorées)."""
+    etapes = {e.nom: e for e in ETAPES}
+    choisies = noms or list(etapes)
+    inconnues = [n for n in choisies if n not in etapes]
+    if inconnues:
+        raise KeyError(f"Étapes inconnues : {inconnues} (disponibles : {list(etapes)})")
+
+    deps = dependances(ETAPES)
+    etat = lit_etat()
+
+    # Étapes à reconstruire : périmées, forcées, ou en aval d'une étape reconstruite
+    a_faire = set()
+    for nom in choisies:
+        if force or not est_a_jour(etapes[nom], etat, distant):
+            a_faire.add(nom)
+    change = True
+    while change:
+        change = False
+        for nom in choisies:
+            if nom not in a_faire and deps[nom] & a_faire:
+                a_faire.add(nom)
+                change = True
+
+    for nom in choisies:
+        print(f"[PIPELINE] {nom:<14} {'à reconstruire' if nom in a_faire else 'à jour'}")
+    if not a_faire:
+        return {}, set()
+
+    resultats = {}
+    en_cours = {}
+    echecs = set()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while a_faire or en_cours:
+            # Soumettre toutes les étapes dont les dépendances sont terminées
+            for nom in sorted(a_faire):
+                bloquantes = deps[nom] & (a_faire | set(en_cours.values()))
+                if deps[nom] & echecs:
+                    print(f"[PIPELINE] {nom} ignorée (dépendance en échec)")
+                    a_faire.discard(nom)
+                    echecs.add(nom)
+                elif not bloquantes:
+                    print(f"[PIPELINE] {nom} : démarrage ({etapes[nom].script})")
+                    en_cours[pool.submit(execute_etape, etapes[nom].script)] = nom
+                    a_faire.discard(nom)
+
+            if not en_cours:
+                break
+            finis, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in finis:
+                nom = en_cours.pop(futur)
+                try:
+                    duree = futur.result()
+                except Exception as exc:
+                    print(f"[PIPELINE] {nom} : ÉCHEC ({exc!r})")
+                    echecs.add(nom)
+                    continue
+                etat[nom] = {
+                    "empreinte": empreinte(etapes[nom]),
+                    "sorties": empreintes_sorties(etapes[nom]),
+                    "duree_s": round(duree, 3),
+                    "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                ecrit_etat(etat)
+                resultats[nom] = duree
+                print(f"[PIPELINE] {nom} : terminé en {duree:.1f} s")
+
+    if echecs:
+        print(f"[PIPELINE] Étapes en échec : {sorted(echecs)}")
+    return resultats, echecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lance les scripts en ne refaisant que le nécessaire")
+    parser.add_argument("etapes", nargs="*", help="étapes à lancer (défaut : toutes)")
+    parser.add_argument("--force", action="store_true", help="reconstruit même si à jour")
+    parser.add_argument(
+        "--distant", action="store_true",
+        help="relance aussi les étapes qui téléchargent leurs données",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="nb de processus en parallèle")
+    parser.add_argument("--liste", action="store_true", help="affiche les étapes et quitte")
+    args = parser.parse_args()
+
+    # Les chemins des étapes sont relatifs au dépôt
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if args.liste:
+        for e in ETAPES:
+            print(f"{e.nom:<14} {e.script:<24} -> {', '.join(e.sorties)}")
+        return
+
+    _, echecs = lance(args.etapes, force=args.force, distant=args.distant, jobs=args.jobs)
+    if echecs:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from difflib import get_close_matches
+from functools import lru_cache
+
+from canonisation import compile_index, est_manquante
+from parse_amm_bdpm import (
+    FICHIER_COMPO,
+    FICHIER_MEDICAMENTS,
+    FICHIER_SUBSTANCES,
+    construit_dict_substances,
+    lit_compo,
+    normalise_chaine,
+    rapproche_substance,
+)
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+HOTE = "127.0.0.1"
+PORT = 8765
+
+FICHIER_CODES = "icd10pcs_all_codes_labels.csv"
+FICHIER_CODES_SUPPRIMES = "icd10pcs_deleted_with_labels.csv"
+
+LIMITE_PREFIXE = 50  # nb max de codes renvoyés par préfixe
+LIMITE_PREFIXE_MAX = 1000
+TAILLE_CORPS_MAX = 10 * 1024 ** 2
+TAILLE_CACHE = 65536  # résultats de rapprochement mémorisés
+
+# Repli flou (get_close_matches sur ~4,5k libellés COMPO : ~7 ms par nom inconnu)
+# exécuté dans des processus à part pour ne jamais bloquer la boucle asyncio
+WORKERS_FLOU = max(1, (os.cpu_count() or 2) // 2)
+SEUIL_FLOU = 0.8  # même cutoff que rapproche_substance
+
+
+# =========================
+# INDEX EN MÉMOIRE
+# =========================
+
+def _lit_csv(chemin: str, sep: str = ",", encoding: str = "utf-8"):
+    if not os.path.exists(chemin):
+        print(f"[INDEX] Fichier manquant : {chemin} (ignoré)")
+        return []
+    with open(chemin, newline="", encoding=encoding) as f:
+        return list(csv.DictReader(f, delimiter=sep))
+
+
+# Libellés COMPO du processus worker (voir _init_flou)
+_noms_flou = []
+
+
+def _init_flou(noms):
+    global _noms_flou
+    _noms_flou = noms
+
+
+def _rapproche_flou(norm: str):
+    """Exécuté dans un worker : libellé COMPO le plus proche, None sinon."""
+    trouves = get_close_matches(norm, _noms_flou, n=1, cutoff=SEUIL_FLOU)
+    return trouves[0] if trouves else None
+
+
+def _cle_substance(code) -> str:
+    # Code reçu en JSON (901) ou lu dans un CSV antérieur au typage Int64 ("901.0")
+    code = str(code).strip()
+    return code[:-2] if code.endswith(".0") else code
+
+
+class Index:
+    """Index construits une fois au démarrage à partir des sorties des scripts."""
+
+    def __init__(self, dossier: str = ".", fichier_compo: str = FICHIER_COMPO):
+        debut = time.perf_counter()
+
+        # Codes ICD-10-PCS : dict exact + liste triée pour la recherche par préfixe
+        self.codes = {
+            r["code"]: r["libelle"]
+            for r in _lit_csv(os.path.join(dossier, FICHIER_CODES))
+        }
+        self.codes_tries = sorted(self.codes)
+        self.suppressions = {}
+        for r in _lit_csv(os.path.join(dossier, FICHIER_CODES_SUPPRIMES)):
+            self.suppressions.setdefault(r["code"], []).append(
+                {"annee_suppression": r["annee_suppression"], "libelle": r["libelle"]}
+            )
+
+        # Médicaments ARP : Code_ARP -> libellés
+        self.medicaments = {}
+        for r in _lit_csv(
+            os.path.join(dossier, FICHIER_MEDICAMENTS), sep=";", encoding="utf-8-sig"
+        ):
+            self.medicaments.setdefault(r["Code_ARP"], []).append(r["Libelle_medicament"])
+
+        # Substances : substance -> produits (index inverse)
+        self.produits_par_substance = {}
+        for r in _lit_csv(
+            os.path.join(dossier, FICHIER_SUBSTANCES), sep=";", encoding="utf-8-sig"
+        ):
+            code_sub = _cle_substance(r["Code_substance"])
+            self.produits_par_substance.setdefault(code_sub, set()).add(r["Code_ARP"])
+        self.produits_par_substance = {
+            k: sorted(v) for k, v in self.produits_par_substance.items()
+        }
+
+        # DCI -> substance BDPM : même rapprochement que parse_amm_bdpm (COMPO,
+        # exact puis canonique puis flou), résultats mémorisés par nom normalisé
+        self.dict_substances = {}
+        if os.path.exists(fichier_compo):
+            self.dict_substances = construit_dict_substances(lit_compo(fichier_compo))
+        else:
+            print(f"[INDEX] Fichier manquant : {fichier_compo} (ignoré)")
+        self.noms_substances = list(self.dict_substances)
+        self.index_canonique = compile_index(self.dict_substances)
+        self.rapproche = lru_cache(maxsize=TAILLE_CACHE)(self._rapproche)
+        self.rapproche_rapide = lru_cache(maxsize=TAILLE_CACHE)(self._rapproche_rapide)
+        self.cache_flou = {}
+        self.pool_flou = None  # ProcessPoolExecutor posé par lance_serveur
+
+        print(
+            f"[INDEX] {len(self.codes)} codes, {len(self.medicaments)} médicaments, "
+            f"{len(self.produits_par_substance)} substances, "
+            f"{len(self.dict_substances)} libellés COMPO "
+            f"({(time.perf_counter() - debut) * 1000:.0f} ms)"
+        )
+
+    def cherche_code(self, code: str, prefixe: bool = False, limite: int = LIMITE_PREFIXE):
+        code = code.strip().upper()
+        if not prefixe:
+            return {
+                "code": code,
+                "libelle": self.codes.get(code),
+                "suppressions": self.suppressions.get(code, []),
+            }
+        trouves = []
+        i = bisect_left(self.codes_tries, code)
+        while i < len(self.codes_tries) and len(trouves) < limite:
+            c = self.codes_tries[i]
+            if not c.startswith(code):
+                break
+            trouves.append({"code": c, "libelle": self.codes[c]})
+            i += 1
+        return {"prefixe": code, "codes": trouves}
+
+    def cherche_produits(self, code_substance):
+        code_sub = _cle_substance(code_substance)
+        return {
+            "Code_substance": code_sub,
+            "produits": [
+                {"Code_ARP": arp, "Libelles": self.medicaments.get(arp, [])}
+                for arp in self.produits_par_substance.get(code_sub, [])
+            ],
+        }
+
+    def _rapproche(self, norm: str):
+        return rapproche_substance(
+            norm, self.dict_substances, self.noms_substances, self.index_canonique
+        )
+
+    def _rapproche_rapide(self, norm: str):
+        """Exact puis canonique ; None quand seul le repli flou peut conclure."""
+        code_sub, lib_sub, methode = rapproche_substance(
+            norm, self.dict_substances, (), self.index_canonique
+        )
+        if methode == "non_trouve" and not est_manquante(norm):
+            return None
+        return code_sub, lib_sub, methode
+
+    @staticmethod
+    def _resultat_substance(nom, norm, code_sub, lib_sub, methode):
+        substance = None
+        if code_sub is not None:
+            substance = {"Code_substance": _cle_substance(code_sub), "Libelle_substance": lib_sub}
+        return {"nom": nom, "Substance_norm": norm, "substance": substance, "methode": methode}
+
+    def cherche_substance(self, nom: str):
+        norm = normalise_chaine(nom)
+        return self._resultat_substance(nom, norm, *self.rapproche(norm))
+
+    async def cherche_substances(self, noms):
+        """
+        Comme cherche_substance sur une liste, sans bloquer la boucle : exact et
+        canonique sur place, repli flou des noms restants dans pool_flou.
+        """
+        if self.pool_flou is None:
+            return [self.cherche_substance(nom) for nom in noms]
+
+        normes = [normalise_chaine(nom) for nom in noms]
+        rapides = [self.rapproche_rapide(norm) for norm in normes]
+        a_chercher = sorted({
+            norm for norm, r in zip(normes, rapides)
+            if r is None and norm not in self.cache_flou
+        })
+        if a_chercher:
+            boucle = asyncio.get_running_loop()
+            meilleurs = await asyncio.gather(*(
+                boucle.run_in_executor(self.pool_flou, _rapproche_flou, norm)
+                for norm in a_chercher
+            ))
+            if len(self.cache_flou) + len(a_chercher) > TAILLE_CACHE:
+                self.cache_flou.clear()
+            self.cache_flou.update(zip(a_chercher, meilleurs))
+
+        resultats = []
+        for nom, norm, r in zip(noms, normes, rapides):
+            if r is None:
+                meilleur = self.cache_flou.get(norm)
+                r = (*self.dict_substances[meilleur], "flou") if meilleur else (None, None, "non_trouve")
+            resultats.append(self._resultat_substance(nom, norm, *r))
+        return resultats
+
+
+# =========================
+# SERVEUR HTTP / JSON
+# =========================
+
+class RequeteInvalide(ValueError):
+    """Corps de requête refusé (400)."""
+
+
+def _options_codes(opts: dict) -> dict:
+    prefixe = opts.get("prefixe", False)
+    limite = opts.get("limite", LIMITE_PREFIXE)
+    if not isinstance(prefixe, bool):
+        raise RequeteInvalide('"prefixe" doit être un booléen')
+    if isinstance(limite, bool) or not isinstance(limite, int) or not 1 <= limite <= LIMITE_PREFIXE_MAX:
+        raise RequeteInvalide(f'"limite" doit être un entier entre 1 et {LIMITE_PREFIXE_MAX}')
+    return {"prefixe": prefixe, "limite": limite}
+
+
+def _est_texte(q) -> bool:
+    return isinstance(q, str)
+
+
+def _est_code_substance(q) -> bool:
+    return isinstance(q, str) or (isinstance(q, int) and not isinstance(q, bool))
+
+
+# route -> (clé de la liste dans le corps JSON, validation d'un élément,
+#           validation des options, recherche sur la liste (éventuellement coroutine))
+ROUTES = {
+    "/codes": ("codes", _est_texte, _options_codes,
+               lambda idx, qs, opts: [idx.cherche_code(q, **opts) for q in qs]),
+    "/substances/produits": ("substances", _est_code_substance, lambda opts: {},
+                             lambda idx, qs, opts: [idx.cherche_produits(q) for q in qs]),
+    "/substances/nom": ("noms", _est_texte, lambda opts: {},
+                        lambda idx, qs, opts: idx.cherche_substances(qs)),
+}
+
+RAISONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+async def traite_requete(index: Index, methode: str, chemin: str, corps: bytes):
+    """Retourne (statut, objet JSON) pour une requête déjà lue."""
+    if chemin == "/sante":
+        return 200, {"statut": "ok", "codes": len(index.codes)}
+    if chemin not in ROUTES:
+        return 404, {"erreur": f"route inconnue : {chemin}"}
+    if methode != "POST":
+        return 405, {"erreur": "utiliser POST avec un corps JSON"}
+
+    cle, element_valide, valide_options, fonction = ROUTES[chemin]
+    try:
+        corps_json = json.loads(corps or b"{}")
+        requetes = corps_json[cle]
+        if not isinstance(requetes, list):
+            raise TypeError(cle)
+    except (ValueError, KeyError, TypeError):
+        return 400, {"erreur": f'corps attendu : {{"{cle}": [...]}}'}
+
+    try:
+        opts = valide_options(corps_json)
+        for i, q in enumerate(requetes):
+            if not element_valide(q):
+                raise RequeteInvalide(f"{cle}[{i}] invalide : {q!r}")
+    except RequeteInvalide as exc:
+        return 400, {"erreur": str(exc)}
+
+    debut = time.perf_counter_ns()
+    resultats = fonction(index, requetes, opts)
+    if asyncio.iscoroutine(resultats):
+        resultats = await resultats
+    duree_us = (time.perf_counter_ns() - debut) / 1000
+    return 200, {"resultats": resultats, "nb": len(resultats), "duree_us": duree_us}
+
+
+def _reponse(statut: int, objet: dict, fermer: bool) -> bytes:
+    reponse = json.dumps(objet, ensure_ascii=False).encode("utf-8")
+    return (
+        f"HTTP/1.1 {statut} {RAISONS[statut]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(reponse)}\r\n"
+        f"Connection: {'close' if fermer else 'keep-alive'}\r\n\r\n".encode("latin-1")
+        + reponse
+    )
+
+
+async def gere_connexion(index: Index, reader, writer):
+    # HTTP/1.1 minimal avec keep-alive : une connexion = plusieurs requêtes
+    try:
+        while True:
+            ligne = await reader.readline()
+            if not ligne:
+                break
+            try:
+                methode, chemin, _ = ligne.decode("latin-1").split(" ", 2)
+            except ValueError:
+                break
+
+            entetes = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                nom, _, valeur = h.decode("latin-1").partition(":")
+                entetes[nom.strip().lower()] = valeur.strip()
+
+            # Longueur illisible : le découpage des requêtes suivantes est perdu,
+            # on répond 400 puis on ferme la connexion
+            try:
+                longueur = int(entetes.get("content-length", 0) or 0)
+                if longueur < 0:
+                    raise ValueError(longueur)
+            except ValueError:
+                writer.write(_reponse(400, {"erreur": "Content-Length invalide"}, fermer=True))
+                await writer.drain()
+                break
+            if longueur > TAILLE_CORPS_MAX:
+                writer.write(_reponse(413, {"erreur": "corps trop volumineux"}, fermer=True))
+                await writer.drain()
+                break
+            corps = await reader.readexactly(longueur) if longueur else b""
+
+            try:
+                statut, objet = await traite_requete(index, methode, chemin, corps)
+            except Exception as exc:
+                print(f"[ERREUR] {methode} {chemin} : {exc!r}")
+                statut, objet = 500, {"erreur": "erreur interne"}
+            fermer = entetes.get("connection", "").lower() == "close"
+            writer.write(_reponse(statut, objet, fermer))
+            await writer.drain()
+            if fermer:
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def lance_serveur(index: Index, hote: str = HOTE, port: int = PORT,
+                        workers_flou: int = WORKERS_FLOU):
+    serveur = await asyncio.start_server(
+        lambda r, w: gere_connexion(index, r, w), hote, port
+    )
+    print(f"Service de recherche sur http://{hote}:{port} ({workers_flou} workers flou)")
+    with ProcessPoolExecutor(
+        max_workers=workers_flou, initializer=_init_flou, initargs=(index.noms_substances,)
+    ) as pool:
+        index.pool_flou = pool
+        try:
+            async with serveur:
+                await serveur.serve_forever()
+        finally:
+            index.pool_flou = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service local de recherche codes / substances")
+    parser.add_argument("--hote", default=HOTE)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--dossier", default=".", help="dossier contenant les CSV générés")
+    parser.add_argument("--compo", default=FICHIER_COMPO, help="fichier CIS_COMPO_bdpm.txt")
+    parser.add_argument(
+        "--workers-flou", type=int, default=WORKERS_FLOU,
+        help="processus du rapprochement flou des noms inconnus",
+    )
+    args = parser.parse_args()
+
+    index = Index(args.dossier, args.compo)
+    try:
+        asyncio.run(lance_serveur(index, args.hote, args.port, args.workers_flou))
+    except KeyboardInterrupt:
+        print("Arrêt du service.")
+
+
+if __name__ == "__main__":
+    main()
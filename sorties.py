@@ -0,0 +1,81 @@
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+# =========================
+# PARAMÈTRES
+# =========================
+
+# Formats écrits en plus du fichier principal (CSV ou XLSX)
+FORMATS_ANNEXES = ("parquet", "sqlite")
+
+# Base SQLite commune, créée à côté des fichiers de sortie (une table par fichier)
+FICHIER_SQLITE = "sorties.sqlite"
+
+# Colonnes indexées dans SQLite lorsqu'elles sont présentes
+COLONNES_INDEXEES = ("code", "Code_ARP", "Code_substance")
+
+
+# =========================
+# ÉCRIVAINS
+# =========================
+
+def _colonnes_typees(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes object -> string pour avoir un schéma stable (Parquet / SQLite)."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == "object":
+            df[col] = df[col].astype("string")
+    return df
+
+
+def ecrit_parquet(df: pd.DataFrame, chemin: Path):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print(f"[SORTIES] pyarrow absent, Parquet ignoré pour {chemin.name}")
+        return
+    chemin_parquet = chemin.with_suffix(".parquet")
+    _colonnes_typees(df).to_parquet(
+        chemin_parquet, index=False, engine="pyarrow", use_dictionary=True
+    )
+    print(f"[SORTIES] Parquet : {chemin_parquet}")
+
+
+def ecrit_sqlite(df: pd.DataFrame, chemin: Path):
+    chemin_db = chemin.parent / FICHIER_SQLITE
+    table = chemin.stem
+    con = sqlite3.connect(chemin_db)
+    try:
+        with con:
+            _colonnes_typees(df).to_sql(table, con, if_exists="replace", index=False)
+            for col in COLONNES_INDEXEES:
+                if col in df.columns:
+                    con.execute(
+                        f'CREATE INDEX IF NOT EXISTS "idx_{table}_{col}" ON "{table}" ("{col}")'
+                    )
+    finally:
+        con.close()
+    print(f"[SORTIES] SQLite : {chemin_db} (table {table})")
+
+
+ECRIVAINS = {
+    "parquet": ecrit_parquet,
+    "sqlite": ecrit_sqlite,
+}
+
+
+def ecrit_sorties(df: pd.DataFrame, chemin, formats=FORMATS_ANNEXES, **kwargs):
+    """
+    Écrit le fichier principal (CSV, ou XLSX selon l'extension) puis chaque
+    format annexe demandé. `kwargs` est transmis à to_csv / to_excel.
+    """
+    chemin = Path(chemin)
+    if chemin.suffix.lower() == ".xlsx":
+        df.to_excel(chemin, index=False, **kwargs)
+    else:
+        df.to_csv(chemin, index=False, **kwargs)
+
+    for fmt in formats:
+        ECRIVAINS[fmt](df, chemin)
@@ -0,0 +1,100 @@
+import os
+
+import pandas as pd
+import pytest
+
+import parse_amm_bdpm
+from parse_amm_bdpm import (
+    CLES_SORTIES,
+    DOSSIER_CHANGESETS,
+    FICHIER_MEDICAMENTS,
+    FICHIER_SUBSTANCES,
+    calcule_changeset,
+    ecrit_toutes_sorties,
+)
+
+CLES = ["Code_ARP"]
+
+
+def _df(lignes):
+    return pd.DataFrame(lignes, columns=["Code_ARP", "Libelle_medicament"])
+
+
+def test_ajouts_suppressions_modifications():
+    ancien = _df([("ARP1", "A - 10 cp"), ("ARP2", "B - 20 cp"), ("ARP3", "C")])
+    nouveau = _df([("ARP1", "A - 10 cp"), ("ARP2", "B - 30 cp"), ("ARP4", "D")])
+
+    ajoutes, supprimes, modifies = calcule_changeset(ancien, nouveau, CLES)
+
+    assert ajoutes.to_dict("records") == [{"Code_ARP": "ARP4", "Libelle_medicament": "D"}]
+    assert supprimes.to_dict("records") == [{"Code_ARP": "ARP3", "Libelle_medicament": "C"}]
+    # les lignes modifiées portent les nouvelles valeurs
+    assert modifies.to_dict("records") == [{"Code_ARP": "ARP2", "Libelle_medicament": "B - 30 cp"}]
+
+
+def test_sans_version_precedente_tout_est_ajoute():
+    nouveau = _df([("ARP1", "A"), ("ARP2", "B")])
+    ajoutes, supprimes, modifies = calcule_changeset(None, nouveau, CLES)
+    assert len(ajoutes) == 2
+    assert supprimes.empty and modifies.empty
+
+
+def test_valeurs_comparees_en_texte():
+    # la version précédente est relue en texte : 901 (Int64) == "901"
+    ancien = pd.DataFrame({"Code_ARP": ["ARP1"], "Code_substance": ["901"], "Libelle_substance": ["X"]})
+    nouveau = pd.DataFrame({
+        "Code_ARP": ["ARP1"],
+        "Code_substance": pd.array([901], dtype="Int64"),
+        "Libelle_substance": ["X"],
+    })
+    ajoutes, supprimes, modifies = calcule_changeset(ancien, nouveau, CLES_SORTIES[FICHIER_SUBSTANCES])
+    assert ajoutes.empty and supprimes.empty and modifies.empty
+
+
+@pytest.mark.parametrize("version", ["nouvelle", "précédente"])
+def test_cles_en_double_levent(version):
+    doublons = _df([("ARP1", "A"), ("ARP1", "A bis")])
+    propre = _df([("ARP1", "A")])
+    ancien, nouveau = (propre, doublons) if version == "nouvelle" else (doublons, propre)
+    with pytest.raises(ValueError, match=version):
+        calcule_changeset(ancien, nouveau, CLES)
+
+
+def test_erreur_de_changeset_n_ecrase_aucune_sortie(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ancien_med = "Code_ARP;Libelle_medicament\nARP1;A\n"
+    with open(FICHIER_MEDICAMENTS, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(ancien_med)
+
+    # 1re sortie valide, 2e avec des clés en double : rien ne doit être écrit
+    sorties = {
+        FICHIER_MEDICAMENTS: _df([("ARP1", "A"), ("ARP2", "B")]),
+        FICHIER_SUBSTANCES: pd.DataFrame({
+            "Code_ARP": ["ARP1", "ARP1"],
+            "Code_substance": [901, 901],
+            "Libelle_substance": ["X", "X"],
+        }),
+    }
+    with pytest.raises(ValueError):
+        ecrit_toutes_sorties(sorties, changeset=True)
+
+    with open(FICHIER_MEDICAMENTS, encoding="utf-8-sig", newline="") as f:
+        assert f.read() == ancien_med
+    assert not os.path.exists(FICHIER_SUBSTANCES)
+    assert not os.path.exists(DOSSIER_CHANGESETS)
+
+
+def test_changeset_ecrit_avant_les_sorties(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(FICHIER_MEDICAMENTS, "w", encoding="utf-8-sig", newline="") as f:
+        f.write("Code_ARP;Libelle_medicament\nARP1;A\n")
+
+    ecrit_toutes_sorties({FICHIER_MEDICAMENTS: _df([("ARP1", "A"), ("ARP2", "B")])}, changeset=True)
+
+    (run,) = os.listdir(DOSSIER_CHANGESETS)
+    ajoutes = pd.read_csv(
+        os.path.join(DOSSIER_CHANGESETS, run, "codes_medicaments_ajoutes.csv"),
+        sep=";", encoding="utf-8-sig",
+    )
+    assert ajoutes["Code_ARP"].tolist() == ["ARP2"]
+    assert parse_amm_bdpm.lit_snapshot(FICHIER_MEDICAMENTS)["Code_ARP"].tolist() == ["ARP1", "ARP2"]
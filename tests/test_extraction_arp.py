@@ -0,0 +1,163 @@
+import io
+import json
+import os
+
+import pytest
+
+import extraction_arp
+from extraction_arp import ExtracteurTableAMM, extrait_table_arp, iter_lignes_arp
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+URL = "https://arp.sn/liste-des-amms/"
+
+
+def fixture(nom: str) -> bytes:
+    with open(os.path.join(FIXTURES, nom), "rb") as f:
+        return f.read()
+
+
+class FausseReponse:
+    def __init__(self, contenu: bytes, type_contenu="text/html", encoding=None):
+        self.contenu = contenu
+        self.headers = {"Content-Type": type_contenu}
+        self.encoding = encoding
+        self.raw = io.BytesIO(contenu)
+
+    @property
+    def text(self):
+        return self.contenu.decode(self.encoding or "utf-8")
+
+    def json(self):
+        return json.loads(self.contenu)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FausseSession:
+    """requests.Session minimal : url -> réponse, et un endpoint DataTables paginé."""
+
+    def __init__(self, pages, donnees_ajax=None):
+        self.pages = pages
+        self.donnees_ajax = donnees_ajax
+        self.appels = []
+
+    def get(self, url, params=None, **kwargs):
+        self.appels.append((url, params))
+        if params is not None:
+            debut, longueur = params["start"], params["length"]
+            corps = dict(self.donnees_ajax, data=self.donnees_ajax["data"][debut:debut + longueur])
+            return FausseReponse(json.dumps(corps).encode("utf-8"), "application/json")
+        return self.pages[url]()
+
+
+def page(nom, **kwargs):
+    return lambda: FausseReponse(fixture(nom), **kwargs)
+
+
+def test_page_unique():
+    extracteur = ExtracteurTableAMM(io.BytesIO(fixture("arp_page2.html")), url_base=URL)
+    lignes = list(extracteur.lignes())
+
+    assert extracteur.entetes[:3] == ["Nom du Medicament", "Numero AMM", "DCI"]
+    assert [l["Numero AMM"] for l in lignes] == ["0", "1", "2", "3"]
+    assert extracteur.page_suivante is None
+    assert extracteur.url_ajax is None
+
+
+def test_pagination_rel_next():
+    session = FausseSession({
+        URL: page("arp_page1.html"),
+        URL + "?pg=2": page("arp_page2.html"),
+    })
+    df = extrait_table_arp(URL, session=session)
+
+    assert len(df) == 6 + 4
+    assert [u for u, _ in session.appels] == [URL, URL + "?pg=2"]
+    assert df["DCI"].iloc[0] == "LUMÉFANTRINE WTGML"
+
+
+def test_lien_next_avant_le_tableau_ignore():
+    # Le rel="next" de la navigation WordPress précède le tableau : seul le lien
+    # placé après le tableau AMM est suivi
+    extracteur = ExtracteurTableAMM(io.BytesIO(fixture("arp_page1.html")), url_base=URL)
+    list(extracteur.lignes())
+    assert extracteur.page_suivante == URL + "?pg=2"
+
+
+def test_pagination_arretee_sur_page_sans_tableau():
+    session = FausseSession({
+        URL: page("arp_page1.html"),
+        URL + "?pg=2": lambda: FausseReponse(
+            b"<html><body><a class='next' href='?pg=3'>x</a></body></html>"
+        ),
+    })
+    lignes = list(iter_lignes_arp(URL, session=session))
+
+    assert len(lignes) == 6
+    assert len(session.appels) == 2
+
+
+def test_repli_datatables(monkeypatch):
+    monkeypatch.setattr(extraction_arp, "TAILLE_PAGE_AJAX", 2)
+    session = FausseSession(
+        {URL: page("arp_datatables.html")},
+        donnees_ajax=json.loads(fixture("arp_datatables.json")),
+    )
+    df = extrait_table_arp(URL, session=session)
+
+    assert list(df.columns) == ["Nom du Medicament", "Numero AMM", "DCI", "dosage"]
+    assert df["Numero AMM"].tolist() == ["101", "102", "103", "104", "105"]
+    assert df["Nom du Medicament"].iloc[0] == "DOLIPRANE 500"   # HTML retiré
+    url_ajax, params = session.appels[1]
+    assert url_ajax == "https://arp.sn/wp-admin/admin-ajax.php?action=liste_amm"
+    assert [p["start"] for _, p in session.appels[1:]] == [0, 2, 4]
+
+
+@pytest.mark.parametrize("type_contenu, encoding", [
+    ("text/html; charset=ISO-8859-1", "ISO-8859-1"),   # charset HTTP
+    ("text/html", None),                              # balise meta seule
+])
+def test_encodage_page(type_contenu, encoding):
+    session = FausseSession({
+        URL: page("arp_latin1.html", type_contenu=type_contenu, encoding=encoding),
+    })
+    df = extrait_table_arp(URL, session=session)
+
+    assert list(df.columns) == ["Nom du Médicament", "Numéro AMM", "DCI"]
+    assert df["DCI"].tolist() == ["PARACÉTAMOL", "IBUPROFÈNE"]
+
+
+def test_table_de_mise_en_page_ignoree():
+    extracteur = ExtracteurTableAMM(io.BytesIO(fixture("arp_mise_en_page.html")), url_base=URL)
+    lignes = list(extracteur.lignes())
+
+    assert extracteur.entetes == ["Nom du Medicament", "DCI"]
+    assert [l["Nom du Medicament"] for l in lignes] == ["AUGMENTIN", "FLAGYL"]
+
+
+def test_entete_une_seule_cellule_refusee():
+    motifs = extraction_arp.MOTIFS_TABLE_AMM
+    assert not extraction_arp._entete_correspond(["Nom du Medicament DCI"], motifs)
+    assert not extraction_arp._entete_correspond(["Nom et DCI", "Dosage"], motifs)
+    assert extraction_arp._entete_correspond(["Nom", "DCI"], motifs)
+
+
+def test_aucun_tableau():
+    session = FausseSession({URL: lambda: FausseReponse(b"<html><body><p>vide</p></body></html>")})
+    with pytest.raises(ValueError):
+        list(iter_lignes_arp(URL, session=session))
+
+
+def test_repli_csv():
+    contenu = "Nom du Medicament;DCI\nDOLIPRANE;PARACÉTAMOL\n".encode("utf-8")
+    session = FausseSession({URL: lambda: FausseReponse(contenu, "text/csv", "utf-8")})
+    assert list(iter_lignes_arp(URL, session=session)) == [
+        {"Nom du Medicament": "DOLIPRANE", "DCI": "PARACÉTAMOL"}
+    ]
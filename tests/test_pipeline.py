@@ -0,0 +1,35 @@
+import ast
+import os
+
+import pytest
+
+import pipeline
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _modules_locaux(script, vus=None):
+    """Modules du dépôt importés par un script, directement ou par un autre module local."""
+    vus = set() if vus is None else vus
+    with open(os.path.join(RACINE, script), encoding="utf-8") as f:
+        arbre = ast.parse(f.read())
+    for noeud in ast.walk(arbre):
+        if isinstance(noeud, ast.Import):
+            noms = [a.name for a in noeud.names]
+        elif isinstance(noeud, ast.ImportFrom) and noeud.module and not noeud.level:
+            noms = [noeud.module]
+        else:
+            continue
+        for nom in noms:
+            fichier = f"{nom.split('.')[0]}.py"
+            if fichier not in vus and os.path.exists(os.path.join(RACINE, fichier)):
+                vus.add(fichier)
+                _modules_locaux(fichier, vus)
+    return vus
+
+
+@pytest.mark.parametrize("etape", pipeline.ETAPES, ids=lambda e: e.nom)
+def test_modules_declares(etape):
+    # Un module local absent de `modules` ne change pas l'empreinte : l'étape
+    # serait jugée à jour après une modification de ce module
+    assert _modules_locaux(etape.script) - {etape.script} <= set(etape.modules)
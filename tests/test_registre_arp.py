@@ -0,0 +1,47 @@
+import pandas as pd
+
+from parse_amm_bdpm import (
+    FICHIER_MEDICAMENTS,
+    amorce_registre,
+    attribue_codes_arp,
+    registre_vide,
+    verifie_codes_publies,
+)
+
+
+def _publie(lignes):
+    with open(FICHIER_MEDICAMENTS, "w", encoding="utf-8-sig", newline="") as f:
+        f.write("Code_ARP;Libelle_medicament\n")
+        f.writelines(f"{code};{libelle}\n" for code, libelle in lignes)
+
+
+def test_registre_perdu_reamorce_depuis_les_codes_publies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _publie([("ARP000007", "BETA - BOITE / 1"), ("ARP000003", "ZETA - FLACON")])
+    assert registre_vide("registre.sqlite")
+
+    # "ALPHA" est nouveau et passerait devant tout le monde en numérotation triée
+    amorce = amorce_registre({"BETA": {"BETA - BOITE / 1"}, "ZETA": {"ZETA - FLACON"}})
+    codes = attribue_codes_arp(["ALPHA", "BETA", "ZETA"], "registre.sqlite", amorce=amorce)
+
+    assert codes == {"ALPHA": "ARP000008", "BETA": "ARP000007", "ZETA": "ARP000003"}
+    assert not registre_vide("registre.sqlite")
+    # les runs suivants relisent le registre sans amorce
+    assert attribue_codes_arp(["ALPHA", "BETA", "ZETA"], "registre.sqlite") == codes
+
+
+def test_libelles_publies_ambigus_non_repris(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _publie([("ARP000001", "BETA - BOITE / 1"), ("ARP000002", "BETA - BOITE / 2")])
+    assert amorce_registre({"BETA": {"BETA - BOITE / 1", "BETA - BOITE / 2"}}) == {}
+
+
+def test_codes_differents_des_publies_signales(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    _publie([("ARP000001", "BETA - BOITE / 1"), ("ARP000002", "ZETA - FLACON")])
+    df_med = pd.DataFrame({
+        "Code_ARP": ["ARP000002", "ARP000002"],
+        "Libelle_medicament": ["BETA - BOITE / 1", "ZETA - FLACON"],
+    })
+    assert verifie_codes_publies(df_med) == 1
+    assert "changent de Code_ARP" in capsys.readouterr().out
@@ -1,10 +1,21 @@
 
+import argparse
 import pandas as pd
 from pathlib import Path
 from langdetect import detect_langs
 from deep_translator import GoogleTranslator
 import re
 import time
+from collections import Counter
+
+import glossaire
+import instrumentation
+from sorties import ecrit_sorties
+
+# Pause entre deux batchs d'appels Google, et durée d'un appel retenue pour
+# estimer le temps gagné par le glossaire quand aucun appel n'a été mesuré
+PAUSE_BATCH_S = 0.5
+DUREE_APPEL_ESTIMEE_S = 0.5
 
 # ------------------------
 #  Détection & traduction
@@ -45,10 +56,13 @@ def translate_excel_to_french(
     target_lang: str = "fr",
     batch_size: int = 200,
     min_conf: float = 0.60,
+    glossaire_local: bool = True,
 ):
     """
     - Charge le Excel d'entrée
-    - Traduit en français tous les champs texte par batch
+    - Traduit en français tous les champs texte par batch : d'abord via le
+      glossaire local (glossaire.py), Google seulement pour les libellés
+      contenant des mots inconnus
     - Sauvegarde le résultat dans output_xlsx
     """
 
@@ -56,63 +70,140 @@ def translate_excel_to_french(
     output_xlsx = Path(output_xlsx)
 
     print(f"Lecture: {input_xlsx}")
-    df = pd.read_excel(input_xlsx)
+    with instrumentation.etape("lecture"):
+        df = pd.read_excel(input_xlsx)
 
     # Colonnes à traiter : toutes les colonnes texte (object)
-    text_cols = [c for c in df.columns if df[c].dtype == "object"]
+    text_cols = [
+        c for c in df.columns
+        if df[c].dtype == "object" or pd.api.types.is_string_dtype(df[c].dtype)
+    ]
     print(f"Colonnes texte traitées: {text_cols}")
 
     # Cache pour éviter de traduire plusieurs fois la même chaîne
     cache: dict[str, str] = {}
+    nb_cache = nb_inchanges = nb_traduits = nb_glossaire = nb_codes = 0
+    nb_pauses_evitees = 0
+    duree_reseau = 0.0
+    mots_inconnus = Counter()
 
     n_rows = len(df)
     print(f"{n_rows} lignes à traiter…")
 
-    for start in range(0, n_rows, batch_size):
-        end = min(start + batch_size, n_rows)
-        print(f"Batch {start} → {end-1}")
-
-        # Boucle sur les lignes du batch
-        for idx in range(start, end):
-            for col in text_cols:
-                val = df.at[idx, col]
-
-                if not isinstance(val, str):
-                    continue
-
-                txt = val.strip()
-                if not txt:
-                    continue
-
-                # Utiliser la traduction déjà faite si possible
-                if txt in cache:
-                    df.at[idx, col] = cache[txt]
-                    continue
-
-                # Détection de langue
-                lang, conf = _detect_language(txt)
-
-                # Si déjà en français ou confiance faible => on ne touche pas
-                if lang in ("fr", "und") or conf < min_conf:
-                    translated = txt
-                else:
-                    translated = _translate(txt, target_lang)
+    with instrumentation.etape("traduction"):
+        for start in range(0, n_rows, batch_size):
+            end = min(start + batch_size, n_rows)
+            print(f"Batch {start} → {end-1}")
+            appels_batch = glossaire_batch = 0
+
+            # Boucle sur les lignes du batch
+            for idx in range(start, end):
+                for col in text_cols:
+                    val = df.at[idx, col]
+
+                    if not isinstance(val, str):
+                        continue
+
+                    txt = val.strip()
+                    if not txt:
+                        continue
+
+                    # Utiliser la traduction déjà faite si possible
+                    if txt in cache:
+                        df.at[idx, col] = cache[txt]
+                        nb_cache += 1
+                        continue
+
+                    # Glossaire local : tous les mots connus => pas d'appel réseau
+                    if glossaire_local:
+                        # Codes seuls ("C34.1", "8140/3") : jamais envoyés à Google
+                        # (langue 'und'), donc ni succès du glossaire ni temps gagné
+                        if glossaire.est_invariant(txt):
+                            cache[txt] = txt
+                            df.at[idx, col] = txt
+                            nb_codes += 1
+                            continue
+                        translated, inconnus = glossaire.traduit(txt)
+                        if translated is not None:
+                            cache[txt] = translated
+                            df.at[idx, col] = translated
+                            nb_glossaire += 1
+                            glossaire_batch += 1
+                            continue
+                        mots_inconnus.update(inconnus)
+
+                    # Détection de langue
+                    lang, conf = _detect_language(txt)
+
+                    # Si déjà en français ou confiance faible => on ne touche pas
+                    if lang in ("fr", "und") or conf < min_conf:
+                        translated = txt
+                        nb_inchanges += 1
+                    else:
+                        debut = time.perf_counter()
+                        translated = _translate(txt, target_lang)
+                        duree_reseau += time.perf_counter() - debut
+                        nb_traduits += 1
+                        appels_batch += 1
+
+                    cache[txt] = translated
+                    df.at[idx, col] = translated
+
+            # Petite pause pour être gentil avec l'API Google (optionnel)
+            if appels_batch:
+                time.sleep(PAUSE_BATCH_S)
+            elif glossaire_batch:
+                nb_pauses_evitees += 1
+
+    print(
+        f"Cellules : {nb_glossaire} via le glossaire, {nb_traduits} traduites par Google, "
+        f"{nb_inchanges} inchangées, {nb_codes} codes seuls inchangés, {nb_cache} via le cache"
+    )
 
-                cache[txt] = translated
-                df.at[idx, col] = translated
+    # Temps gagné : appels Google évités (durée moyenne mesurée) + pauses sautées ;
+    # les codes seuls n'auraient jamais été envoyés et restent hors du calcul
+    nb_distincts = nb_glossaire + nb_traduits + nb_inchanges
+    duree_appel = duree_reseau / nb_traduits if nb_traduits else DUREE_APPEL_ESTIMEE_S
+    gain = nb_glossaire * duree_appel + nb_pauses_evitees * PAUSE_BATCH_S
+    print(
+        f"Glossaire local : {nb_glossaire}/{nb_distincts} libellés distincts "
+        f"({nb_glossaire / max(nb_distincts, 1):.1%}), ~{gain:.1f} s gagnées "
+        f"({duree_appel:.2f} s/appel {'mesurée' if nb_traduits else 'estimée'}, "
+        f"{nb_pauses_evitees} pauses évitées)"
+    )
+    if mots_inconnus:
+        print("Mots absents du glossaire les plus fréquents : "
+              + ", ".join(f"{m} ({n})" for m, n in mots_inconnus.most_common(15)))
 
-        # Petite pause pour être gentil avec l'API Google (optionnel)
-        time.sleep(0.5)
+    instrumentation.compte("cellules", nb_glossaire, resultat="glossaire")
+    instrumentation.compte("cellules", nb_traduits, resultat="traduite")
+    instrumentation.compte("cellules", nb_inchanges, resultat="inchangee")
+    instrumentation.compte("cellules", nb_codes, resultat="code_inchange")
+    instrumentation.compte("cellules", nb_cache, resultat="cache")
+    instrumentation.compte("temps_gagne_glossaire_s", round(gain, 3))
 
     # Sauvegarde finale
-    df.to_excel(output_xlsx, index=False)
+    with instrumentation.etape("ecriture"):
+        ecrit_sorties(df, output_xlsx)
     print(f"Fichier traduit sauvegardé dans: {output_xlsx}")
 
 
 if __name__ == "__main__":
-    translate_excel_to_french(
-        input_xlsx="source/sitetype.icdo3.d20220429 (1).xlsx",
-        output_xlsx="files/sitetype.icdo3.d20220429.fr.xlsx",
-        target_lang="fr",
-        batch_size=200,
+    parser = argparse.ArgumentParser(description="Traduction FR du classeur ICD-O-3")
+    parser.add_argument(
+        "--sans-glossaire", action="store_true",
+        help="tout envoyer à Google (comparaison avec le glossaire local)",
     )
+    args = instrumentation.ajoute_option_profil(parser).parse_args()
+
+    instrumentation.demarre("translate_icd-o3", profil=args.profile)
+    try:
+        translate_excel_to_french(
+            input_xlsx="source/sitetype.icdo3.d20220429 (1).xlsx",
+            output_xlsx="files/sitetype.icdo3.d20220429.fr.xlsx",
+            target_lang="fr",
+            batch_size=200,
+            glossaire_local=not args.sans_glossaire,
+        )
+    finally:
+        instrumentation.termine()